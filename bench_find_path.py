@@ -0,0 +1,124 @@
+# Benchmark of the find_path searches.
+#
+#   python bench_find_path.py                     on a random map of 1M edges
+#   python bench_find_path.py --map map.txt       on a map file of find_path
+#
+# Runs a full bfs and ucs from one city with find_path.Search on the graph
+# find_path reads, and for comparison with the queue.Queue and
+# queue.PriorityQueue that find_path used to use on the same graph, and
+# prints the queue operations (puts and gets) per second of each. The speedup
+# is the ratio of these rates; both versions of a search push the same
+# entries, so it is also the ratio of their times.
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from queue import PriorityQueue, Queue
+
+import find_path
+
+
+def random_map(cities, edges, seed):
+    # a random map, written as a map file and read by find_path, so that its
+    # distances follow the same rules as those of any other map
+    rng = random.Random(seed)
+    names = ["city%d" % i for i in range(cities)]
+    file = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+    try:
+        with file:
+            for _ in range(edges):
+                a, b = rng.sample(names, 2)
+                file.write("%s %s %d\n" % (a, b, rng.randint(1, 100)))
+            file.write("END OF INPUT\n")
+        return find_path.Graph.load(file.name)
+    finally:
+        os.unlink(file.name)
+
+
+def bfs_queue(graph, origin):
+    # bfs over the whole map with queue.Queue, returns the entries pushed
+    frontier = Queue()
+    reached = set()
+    pushed = 1
+    frontier.put((origin, None))
+    while not frontier.empty():
+        node, _ = frontier.get()
+        if node not in reached:
+            reached.add(node)
+            for child in graph.children(node):
+                if child not in reached:
+                    frontier.put((child, node))
+                    pushed += 1
+    return pushed
+
+
+def ucs_priority_queue(graph, origin):
+    # ucs over the whole map with queue.PriorityQueue, pushing a child only
+    # when its distance improves, as find_path does
+    q = PriorityQueue()
+    reached = set()
+    best = {origin: 0}
+    counter = itertools.count()
+    pushed = 1
+    q.put((0, next(counter), origin, None))
+    while not q.empty():
+        distance, _, node, _ = q.get()
+        if node not in reached:
+            reached.add(node)
+            for child, edge in graph.edges(node):
+                if child not in reached:
+                    cumulative_distance = distance + edge
+                    if cumulative_distance < best.get(child, cumulative_distance + 1):
+                        best[child] = cumulative_distance
+                        q.put((cumulative_distance, next(counter), child, node))
+                        pushed += 1
+    return pushed
+
+
+def search(algorithm):
+    # a full search of find_path from the origin, returns the entries pushed
+    def run(graph, origin):
+        searcher = find_path.Search(find_path.Router(graph).snapshot)
+        find_path.algorithms[algorithm](searcher, origin, None)
+        return searcher.stats.pushed
+    return run
+
+
+def measure(name, search, *args):
+    start = time.perf_counter()
+    # the searches run until the frontier is empty, so every entry pushed
+    # is also popped
+    operations = 2*search(*args)
+    elapsed = time.perf_counter() - start
+    rate = operations/elapsed
+    print("%-20s %10d operations %8.2f s %12.0f operations/sec"
+          % (name, operations, elapsed, rate))
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the find_path searches.")
+    parser.add_argument("--map", help="map file to search, a random map if not given")
+    parser.add_argument("--cities", type=int, default=200000)
+    parser.add_argument("--edges", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.map:
+        graph = find_path.Graph.open(args.map)
+    else:
+        graph = random_map(args.cities, args.edges, args.seed)
+    origin = 0
+
+    old = measure("bfs queue.Queue", bfs_queue, graph, origin)
+    new = measure("bfs find_path", search("bfs"), graph, origin)
+    print("bfs speedup: %.2fx operations/sec" % (new/old))
+    old = measure("ucs PriorityQueue", ucs_priority_queue, graph, origin)
+    new = measure("ucs find_path", search("ucs"), graph, origin)
+    print("ucs speedup: %.2fx operations/sec" % (new/old))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# Benchmark of the four in a row engine, runs without the game_gui front end.
+#
+#   python bench_four_in_a_row.py                      run and print the results
+#   python bench_four_in_a_row.py --output new.json    also save them as JSON
+#   python bench_four_in_a_row.py --baseline old.json  compare with a saved run
+#
+# Every search is run on the same fixed positions at every depth, so two runs
+# of the benchmark can be compared move by move: the placements must be the
+# same, only the time may change.
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import four_in_a_row
+from four_in_a_row import Bitboard
+
+# the positions searched, as the columns played from the empty 6x7 board,
+# PLAYER1 moving first
+CORPUS = {
+    "opening-empty": [],
+    "opening-center": [3, 3, 2, 4],
+    "midgame-14": [2, 1, 3, 5, 0, 0, 6, 4, 0, 2, 4, 0, 4, 1],
+    "midgame-16": [0, 0, 3, 3, 0, 1, 0, 4, 3, 0, 6, 4, 0, 2, 6, 6],
+    "endgame-30": [2, 0, 1, 3, 4, 2, 4, 4, 2, 1, 5, 6, 4, 4, 5, 5, 5, 0, 3, 6,
+                   6, 6, 5, 6, 4, 3, 3, 3, 3, 0],
+    "endgame-34": [3, 4, 4, 6, 0, 3, 5, 2, 6, 5, 0, 6, 5, 0, 3, 6, 5, 6, 1, 3,
+                   1, 3, 6, 5, 2, 0, 5, 3, 4, 4, 0, 1, 1, 1],
+}
+
+SEARCHES = ("minimax", "alphabeta", "expectimax")
+
+
+def position(moves):
+    """
+    Build the board of a corpus position.
+
+    Parameters
+    ----------
+    moves: list of int
+        the columns played, PLAYER1 first
+
+    Returns
+    -------
+    player: PLAYER1 or PLAYER2
+        the player to move
+    board: Bitboard
+        the board, which provides the same methods as the game_gui board
+    """
+    board = Bitboard(6, 7)
+    players = (board.PLAYER1, board.PLAYER2)
+    for i, c in enumerate(moves):
+        board.place(players[i % 2], c)
+    return players[len(moves) % 2], board
+
+
+def time_calls(function, calls):
+    # microseconds per call of function(), best of three rounds
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best/calls*1e6
+
+
+def bench_board_functions(calls):
+    """
+    Time get_child_boards() and evaluate() on every corpus position.
+
+    Returns
+    -------
+    a dict from function name to a dict from position name to microseconds
+    per call
+    """
+    results = {"get_child_boards": {}, "evaluate": {}}
+    for name, moves in CORPUS.items():
+        player, board = position(moves)
+        results["get_child_boards"][name] = time_calls(
+            lambda: four_in_a_row.get_child_boards(player, board), calls)
+        results["evaluate"][name] = time_calls(
+            lambda: four_in_a_row.evaluate(player, board), calls)
+    return results
+
+
+def bench_searches(searches, depths):
+    """
+    Run every search at every depth on every corpus position.
+
+    Each search starts from an empty transposition table, so the results do
+    not depend on what was searched before.
+
+    Returns
+    -------
+    a list of dicts with the search, position, depth, placement, nodes,
+    evaluate calls, milliseconds taken and nodes per second
+    """
+    results = []
+    stats = []
+    previous = four_in_a_row.set_instrumentation(stats.append)
+    try:
+        for search in searches:
+            for name, moves in CORPUS.items():
+                for depth in depths:
+                    player, board = position(moves)
+                    four_in_a_row.transposition_table.clear()
+                    del stats[:]
+                    getattr(four_in_a_row, search)(player, board, depth)
+                    run = stats[-1]
+                    results.append({
+                        "search": search,
+                        "position": name,
+                        "depth": depth,
+                        "placement": run.placement,
+                        "nodes": run.nodes,
+                        "evaluations": run.evaluations,
+                        "ms": run.elapsed_ms,
+                        "nodes_per_sec": run.nodes_per_second(),
+                    })
+                    print("%-10s %-15s depth %d: placement %s, %d nodes, %.1f ms"
+                          % (search, name, depth, run.placement, run.nodes,
+                             run.elapsed_ms), file=sys.stderr)
+    finally:
+        four_in_a_row.set_instrumentation(previous)
+    return results
+
+
+def bench_memory(searches, depth):
+    """
+    Peak memory allocated by every search at the given depth over the whole
+    corpus, in KiB. The transposition table itself is allocated beforehand and
+    not counted, the entries stored in it are.
+    """
+    results = {}
+    for search in searches:
+        peak = 0
+        for moves in CORPUS.values():
+            player, board = position(moves)
+            four_in_a_row.transposition_table.clear()
+            tracemalloc.start()
+            getattr(four_in_a_row, search)(player, board, depth)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        results[search] = peak/1024
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare a run with a baseline run.
+
+    Parameters
+    ----------
+    results, baseline: dict
+        two results of run()
+    tolerance: float
+        how many times slower than the baseline a search may get before it
+        is reported
+
+    Returns
+    -------
+    mismatches: list of str
+        the searches whose placement changed
+    slowdowns: list of str
+        the searches that got slower than the tolerance allows
+    """
+    old = {(r["search"], r["position"], r["depth"]): r
+           for r in baseline["searches"]}
+    mismatches = []
+    slowdowns = []
+    total_old = total_new = 0.0
+    for r in results["searches"]:
+        key = (r["search"], r["position"], r["depth"])
+        if key not in old:
+            continue
+        b = old[key]
+        label = "%s %s depth %d" % key
+        if r["placement"] != b["placement"]:
+            mismatches.append("%s: placement %s, was %s"
+                              % (label, r["placement"], b["placement"]))
+        total_old += b["ms"]
+        total_new += r["ms"]
+        # very short searches are too noisy to compare one by one
+        if b["ms"] >= 10 and r["ms"] > tolerance*b["ms"]:
+            slowdowns.append("%s: %.1f ms, was %.1f ms" % (label, r["ms"], b["ms"]))
+    if total_new:
+        print("searches: %.2fx the speed of the baseline" % (total_old/total_new))
+    for function, times in results["board_functions"].items():
+        for name, us in times.items():
+            was = baseline["board_functions"].get(function, {}).get(name)
+            if was:
+                print("%-16s %-15s %.2f us, was %.2f us" % (function, name, us, was))
+    for search, kib in results["memory_kib"].items():
+        was = baseline["memory_kib"].get(search)
+        if was is not None:
+            print("%-10s peak memory %.0f KiB, was %.0f KiB" % (search, kib, was))
+    return mismatches, slowdowns
+
+
+def run(searches, depths, calls):
+    """
+    Run the whole benchmark and return its results as a dict that can be
+    saved as JSON.
+    """
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "depths": list(depths),
+        "board_functions": bench_board_functions(calls),
+        "searches": bench_searches(searches, depths),
+        "memory_kib": bench_memory(searches, max(depths)),
+    }
+
+
+def summary(results):
+    # nodes per second and time per move of every search at every depth,
+    # averaged over the corpus
+    for search in SEARCHES:
+        for depth in results["depths"]:
+            rows = [r for r in results["searches"]
+                    if r["search"] == search and r["depth"] == depth]
+            if not rows:
+                continue
+            nodes = sum(r["nodes"] for r in rows)
+            ms = sum(r["ms"] for r in rows)
+            print("%-10s depth %d: %8.1f ms per move, %10.0f nodes/sec"
+                  % (search, depth, ms/len(rows), nodes/ms*1000 if ms else 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the four in a row search functions.")
+    parser.add_argument("--searches", default=",".join(SEARCHES),
+                        help="comma separated searches to run")
+    parser.add_argument("--depths", default="1-8",
+                        help="depths to search, as 'first-last' or a comma separated list")
+    parser.add_argument("--calls", type=int, default=2000,
+                        help="calls per round when timing get_child_boards and evaluate")
+    parser.add_argument("--output", help="file to save the results to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="slowdown over the baseline reported as a regression")
+    args = parser.parse_args(argv)
+
+    searches = args.searches.split(",")
+    for search in searches:
+        if search not in SEARCHES:
+            parser.error("unknown search %s" % search)
+    if "-" in args.depths:
+        first, last = args.depths.split("-")
+        depths = list(range(int(first), int(last) + 1))
+    else:
+        depths = [int(d) for d in args.depths.split(",")]
+
+    results = run(searches, depths, args.calls)
+    summary(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatches, slowdowns = compare(results, baseline, args.tolerance)
+        for line in slowdowns:
+            print("slower:", line)
+        for line in mismatches:
+            print("CHANGED:", line)
+        # a change of placement means the engine no longer plays the same
+        if mismatches:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,237 +1,1814 @@
-from queue import PriorityQueue, Queue
+from array import array
+from collections import OrderedDict, deque
+import bisect
+import gzip
+import heapq
+import itertools
+import json
+import lzma
+import math
+import mmap
+import os
+import struct
 import sys
+import threading
+import time
+import zlib
 
-# open the input map
-file = open(sys.argv[2],'r')
-# create a dictionary to store the whole graph
-map = {}
-# create a dictionary to store the distance of each edge
-distances = {}
-# create a dictionary to store heuristic value of each location
-heuristics = {}
-# store every edge in map{}
-for line in file:
-    if line[:3] == "END":
-        break
+# The road map is kept in compressed sparse row (CSR) form. Every city gets
+# an integer id, its position in the sorted list of city names, and the
+# neighbours of city i are targets[offsets[i]:offsets[i+1]], in the order
+# their edges appear in the map file, with the distances of these edges at the
+# same positions of weights.
+#
+# A map can be saved to a binary file in this form and opened again with
+# mmap, which takes next to no time and memory since nothing is parsed:
+#   magic, number of cities, number of neighbour entries, length of the names
+#   offsets   int64 * (cities + 1)
+#   targets   int32 * entries
+#   weights   int64 * entries
+#   name_offsets int64 * (cities + 1), then the utf-8 names one after another
+GRAPH_MAGIC = b"FPCSR001"
+GRAPH_HEADER = struct.Struct("<8sqqq")
+
+# views of arrays stored one after another from position on in data, each
+# given as (typecode, count); returns the views and the position after them
+def read_arrays(data, position, layout):
+    views = []
+    for typecode, count in layout:
+        size = array(typecode).itemsize*count
+        views.append(data[position:position + size].cast(typecode))
+        # every array starts 8 byte aligned
+        position += (size + 7)//8*8
+    return views, position
+
+# write arrays the way read_arrays() reads them
+def write_arrays(file, arrays):
+    for part in arrays:
+        data = part.tobytes()
+        file.write(data)
+        file.write(bytes(-len(data) % 8))
+
+# Map files are read in chunks of CHUNK_SIZE bytes and split into lines as
+# bytes, so a map file of any size is read with little more memory than the
+# graph it makes. They may be compressed with gzip or xz, which is told from
+# their first bytes.
+CHUNK_SIZE = 16 << 20
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+
+# the most memory the process has used so far, as text in MiB, or
+# "unavailable" where there is no resource module (Windows); ru_maxrss is in
+# bytes on macOS and in KiB elsewhere
+def peak_memory():
+    try:
+        import resource
+    except ImportError:
+        return "unavailable"
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return "%.0f MiB" % (peak/2**20 if sys.platform == "darwin" else peak/1024)
+
+# the lines of a map file as bytes, without the newline; the last line need
+# not end with one. If progress is a file, how much of the map file has been
+# read, and the peak memory, are written to it after every chunk
+def map_lines(path, progress=None):
+    raw = open(path, 'rb')
+    size = os.fstat(raw.fileno()).st_size
+    magic = raw.read(len(XZ_MAGIC))
+    raw.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        file = gzip.GzipFile(fileobj=raw)
+    elif magic == XZ_MAGIC:
+        file = lzma.LZMAFile(raw)
     else:
-        line = line[:-1]
-        edge = (line.split(' '))
-        # add location1 as key
-        if edge[0] not in map:
-            map[edge[0]] = [(edge[1])]
-        else:
-            map[edge[0]].append(edge[1])
-        # add location2 as key
-        if edge[1] not in map:
-            map[edge[1]] = [(edge[0])]
-        else:
-            map[edge[1]].append(edge[0])
-
-        # store the distance of each edge in distances{}
-        distances[tuple([edge[0], edge[1]])] = edge[2]
-# close the input map
-file.close()
-
-# process the heuristic file
-# if the command line argument has six or more argument, then the [5] argument is heuristic file
-# store the heuristic file in heuristics{}
-if len(sys.argv) > 5:
-    file2 = open(sys.argv[5],'r')
+        file = raw
+    lines = 0
+    rest = b""
+    try:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = chunk.split(b"\n")
+            chunk[0] = rest + chunk[0]
+            rest = chunk.pop()
+            lines += len(chunk)
+            yield from chunk
+            if progress is not None:
+                progress.write("read %.0f of %.0f MiB, %d lines, peak memory %s\n"
+                               % (raw.tell()/2**20, size/2**20, lines, peak_memory()))
+        if rest:
+            yield rest
+    finally:
+        file.close()
+        raw.close()
+
+# the city names of a graph opened with mmap, decoded one at a time when
+# needed; sorted, so a name is found by bisect
+class Names:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i+1]], "utf-8")
+
+class Graph:
+    def __init__(self, names, offsets, targets, weights):
+        self.names = names
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        # see checksum()
+        self.crc = None
+
+    # read a map file of "location1 location2 distance" lines up to END, or
+    # to its end if there is no END line
+    @classmethod
+    def load(cls, path, progress=None):
+        # ids in the order the cities first appear, renumbered once all the
+        # names are known
+        ids = {}
+        names = []
+        # the edges in the order of their lines
+        sources = array("i")
+        targets = array("i")
+        distances = array("q")
+        for line in map_lines(path, progress):
+            if line[:3] == b"END":
+                break
+            edge = line.split(b' ')
+            if len(edge) < 3:
+                continue
+            for name in edge[:2]:
+                if name not in ids:
+                    ids[name] = len(names)
+                    names.append(name)
+            sources.append(ids[edge[0]])
+            targets.append(ids[edge[1]])
+            distances.append(int(edge[2]))
+        del ids
+
+        # number the cities by name; utf-8 bytes sort like the strings
+        order = sorted(range(len(names)), key=names.__getitem__)
+        renumber = array("i", [0])*len(names)
+        for new, old in enumerate(order):
+            renumber[old] = new
+        names = [str(names[old], "utf-8") for old in order]
+        del order
+
+        # every edge is a neighbour entry of both its cities, with the
+        # distance of its line for now; given marks the entries whose line
+        # lists their city first
+        degrees = array("q", [0])*(len(names) + 1)
+        for a, b in zip(sources, targets):
+            degrees[renumber[a]] += 1
+            degrees[renumber[b]] += 1
+        offsets = array("q", [0])*(len(names) + 1)
+        for i in range(len(names)):
+            offsets[i+1] = offsets[i] + degrees[i]
+        del degrees
+        fill = array("q", offsets)
+        csr_targets = array("i", [0])*offsets[-1]
+        csr_weights = array("q", [0])*offsets[-1]
+        given = bytearray(offsets[-1])
+        for a, b, distance in zip(sources, targets, distances):
+            a, b = renumber[a], renumber[b]
+            i = fill[a]
+            csr_targets[i] = b
+            csr_weights[i] = distance
+            given[i] = 1
+            fill[a] += 1
+            i = fill[b]
+            csr_targets[i] = a
+            csr_weights[i] = distance
+            fill[b] += 1
+        del sources, targets, distances, fill
+
+        # an edge listed again replaces the earlier distance, and an edge
+        # given in one direction only has the same distance both ways: the
+        # distance from u to v is that of the last "u v" line, or if there is
+        # none of the last "v u" line. The entries of a city are in the order
+        # of their lines, so the last one of each kind wins
+        for u in range(len(names)):
+            start, end = offsets[u], offsets[u+1]
+            if end - start < 2:
+                continue
+            forward = {}
+            backward = {}
+            for i in range(start, end):
+                (forward if given[i] else backward)[csr_targets[i]] = csr_weights[i]
+            for i in range(start, end):
+                v = csr_targets[i]
+                csr_weights[i] = forward[v] if v in forward else backward[v]
+        if progress is not None:
+            progress.write("%d cities, %d neighbour entries, peak memory %s\n"
+                           % (len(names), offsets[-1], peak_memory()))
+        return cls(names, offsets, csr_targets, csr_weights)
+
+    # open a map saved with save(), or read a map file if it is not one
+    @classmethod
+    def open(cls, path):
+        file = open(path, 'rb')
+        magic = file.read(len(GRAPH_MAGIC))
+        if magic != GRAPH_MAGIC:
+            file.close()
+            return cls.load(path)
+        data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        file.close()
+        _, cities, entries, name_bytes = GRAPH_HEADER.unpack_from(data)
+        (offsets, targets, weights, name_offsets), position = read_arrays(
+            data, GRAPH_HEADER.size,
+            [("q", cities + 1), ("i", entries), ("q", entries), ("q", cities + 1)])
+        names = Names(name_offsets, data[position:position + name_bytes])
+        return cls(names, offsets, targets, weights)
+
+    # a checksum of the cities and edges, the same for a map file and its
+    # binary graph file; the hierarchy and landmark files keep the one of
+    # the graph they were made for, so that they are not used with another
+    def checksum(self):
+        if self.crc is None:
+            if isinstance(self.names, Names):
+                name_offsets, name_data = self.names.offsets, self.names.data
+            else:
+                encoded = [name.encode("utf-8") for name in self.names]
+                name_offsets = array("q", [0])
+                for name in encoded:
+                    name_offsets.append(name_offsets[-1] + len(name))
+                name_data = b"".join(encoded)
+            crc = 0
+            for part in (self.offsets, self.targets, self.weights, name_offsets, name_data):
+                crc = zlib.crc32(part, crc)
+            self.crc = crc
+        return self.crc
+
+    def save(self, path):
+        encoded = [name.encode("utf-8") for name in self.names]
+        name_offsets = array("q", [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+        file = open(path, 'wb')
+        file.write(GRAPH_HEADER.pack(GRAPH_MAGIC, len(self.names),
+                                     len(self.targets), name_offsets[-1]))
+        write_arrays(file, (array("q", self.offsets), array("i", self.targets),
+                            array("q", self.weights), name_offsets))
+        for name in encoded:
+            file.write(name)
+        file.close()
+
+    # the id of a city, None if it is not on the map
+    def id(self, name):
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return i
+        return None
+
+    def __contains__(self, name):
+        return self.id(name) is not None
+
+    # the neighbours of a city, as ids
+    def children(self, node):
+        return self.targets[self.offsets[node]:self.offsets[node+1]]
+
+    # the neighbours of a city with the distances to them
+    def edges(self, node):
+        start, end = self.offsets[node], self.offsets[node+1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    # the distance of the edge between two cities, None if there is none
+    def distance(self, from_, to_):
+        for child, distance in self.edges(from_):
+            if child == to_:
+                return distance
+        return None
+
+# Search statistics. Every search counts the entries it pushes on its
+# frontier, the entries it pops and skips because their node was expanded
+# already, and the largest size of its frontier, both sides together for the
+# bidirectional searches. With --stats, a query writes them to stderr with
+# the time taken to load the map, search and print; --stats-json writes them
+# as one JSON object instead. --trace FILE writes a line to FILE for every
+# node expanded:  step, side (forward or backward), city, distance (- for
+# bfs and dfs), frontier size, separated by tabs.
+#
+#   python find_path.py ucs map.txt A B --stats --trace ucs.trace
+class SearchStats:
+    def __init__(self, trace=None, names=None):
+        # the trace file, None if there is none, and the city names it uses
+        self.trace = trace
+        self.names = names
+        # seconds taken by each phase of a query: load, search, print
+        self.phases = {}
+        self.pushed = 0
+        self.skipped = 0
+        self.peak_frontier = 0
+        self.steps = 0
+
+    # called before popping from a frontier of the given size
+    def popped(self, size):
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    # called for every node expanded
+    def expanded(self, node, distance, size, side="forward"):
+        self.steps += 1
+        if self.trace is not None:
+            self.trace.write("%d\t%s\t%s\t%s\t%d\n" % (
+                self.steps, side, self.names[node], "-" if distance is None else distance, size))
+
+    def as_dict(self):
+        result = {"nodes_pushed": self.pushed,
+                  "peak_frontier": self.peak_frontier, "duplicates_skipped": self.skipped}
+        for phase, seconds in self.phases.items():
+            result[phase + "_ms"] = round(seconds*1000, 3)
+        return result
+
+    def format(self):
+        lines = ["nodes pushed: %d" % self.pushed,
+                 "peak frontier: %d" % self.peak_frontier,
+                 "duplicates skipped: %d" % self.skipped]
+        for phase, seconds in self.phases.items():
+            lines.append("%s: %.3f ms" % (phase, seconds*1000))
+        return "\n".join(lines)
+
+# read a heuristic file into a dictionary from city id to heuristic value;
+# the cities not on the map are left out
+def load_heuristics(graph, path):
+    heuristics = {}
+    file2 = open(path,'r')
     for line in file2:
         if line[:3] == "END":
             break
         else:
-            line = line[:-1]
+            line = line.rstrip("\n")
             cost = (line.split(' '))
-            heuristics[cost[0]] = cost[1]
+            node = graph.id(cost[0])
+            if node is not None:
+                heuristics[node] = int(cost[1])
     file2.close()
+    return heuristics
 
 # implement get distance function between two locations, order of two arguments doesn't matter
-def get_distance(from_, to_):
-    if (from_, to_) in distances:
-        return distances[(from_, to_)]
-    elif (to_, from_) in distances:
-        return distances[(to_, from_)]
-    else:
+def get_distance(graph, from_, to_):
+    distance = graph.distance(graph.id(from_), graph.id(to_))
+    if distance is None:
         print("no path between "+from_+" and "+to_)
         return 0
+    return distance
 
-# implement print path function
-def print_path(solution):
+# implement format path function, returns the lines the command line prints
+# for a path of city names
+def format_path(graph, solution):
+    lines = []
     # if origin is destination, print it
     if len(solution) == 1:
-        print("distance: 0 mi")
-        print("path:")
-        print("origin is destination")
+        lines.append("distance: 0 mi")
+        lines.append("path:")
+        lines.append("origin is destination")
     # if origin is not destination, print the distance and path
     else:
         distance = 0
         # print the total distance
         for i in range(len(solution)-1):
-            distance += int(get_distance(solution[i], solution[i+1]))
-        print("distance: "+str(distance)+" mi")
+            distance += get_distance(graph, solution[i], solution[i+1])
+        lines.append("distance: "+str(distance)+" mi")
         # print each path and its distance
-        print("path:")
+        lines.append("path:")
         for i in range(len(solution)-1):
-            print(solution[i]+" to "+solution[i+1]+": "+get_distance(solution[i], solution[i+1])+" mi")
-    
+            lines.append(solution[i]+" to "+solution[i+1]+": "+str(get_distance(graph, solution[i], solution[i+1]))+" mi")
+    return "\n".join(lines)
+
 # implement each of the four algorithm
+#
+# Every query gets a Search of its own, which holds everything the search
+# changes, so that searches never see each other's state and can run at the
+# same time in several threads.
+#
+# The frontiers hold nodes together with the node they were reached from,
+# not whole paths. When a node is visited for the first time, the node it was
+# reached from is recorded in parents{}, and the path is rebuilt from there
+# only once the destination is found.
+class Search:
+    def __init__(self, snapshot, trace=None):
+        # the Snapshot of the router the search runs on; its map, heuristics,
+        # hierarchy and landmarks are only read, and stay the same even if the
+        # router loads the map again during the search
+        self.snapshot = snapshot
+        self.graph = snapshot.graph
+        # create a queue used for bfs
+        self.frontier = deque()
+        # create a heap used for ucs and astar
+        self.q = []
+        # create a stack used for dfs
+        self.stack = []
+        # create a set used to store the visited node
+        self.reached = set()
+        # create a dictionary to store the node each visited node was reached from
+        self.parents = {}
+        # create a dictionary to store the shortest distance found so far to
+        # each node in the heap, used by ucs and astar
+        self.best = {}
+        # numbers the heap entries in the order they are pushed, so that
+        # entries of the same cost come out first in first out and are never
+        # compared further
+        self.counter = itertools.count()
+        # the same for the backward half of the bidirectional searches, which
+        # search from the destination towards the origin
+        self.q_backward = []
+        self.reached_backward = set()
+        self.parents_backward = {}
+        self.best_backward = {}
+        self.stats = SearchStats(trace, self.graph.names)
+        # the path found, as city names, None if there is none
+        self.path = None
+
+    # run the search of an algorithm name between two city ids
+    def run(self, algorithm, origin, destination):
+        started = time.perf_counter()
+        self.path = algorithms[algorithm](self, origin, destination)
+        self.stats.phases["search"] = time.perf_counter() - started
+        return self.path
+
+    # the number of nodes the search expanded, on both sides for the
+    # bidirectional searches
+    def nodes_expanded(self):
+        return len(self.reached) + len(self.reached_backward)
+
+    # rebuild the path from the origin to a visited node by following parents{},
+    # as city names
+    def get_path(self, node):
+        path = []
+        while node is not None:
+            path.append(self.graph.names[node])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    # implement bfs
+    def bfs(self, origin, destination):
+        graph, frontier, reached, parents, stats = self.graph, self.frontier, self.reached, self.parents, self.stats
+        # put origin into frontier, it is reached from nowhere
+        frontier.append((origin, None))
+        stats.pushed += 1
 
-# create a queue used for bfs
-frontier = Queue()
-# create a PriorityQueue used for ucs and astar
-q = PriorityQueue()
-# create a stack used for dfs
-stack = []
-# create a list used to store the visited node
-reached = []
-
-# implement bfs
-def bfs(origin, destination):
-    # put origin into frontier
-    frontier.put([origin])
-
-    # while frontier is not empty
-    while not frontier.empty():
-        # pop the last path from frontier
-        path = frontier.get()
-        # get the tail node from the path
-        parent = path[-1]
-
-        # if the node hasn't been visited, put it in visited list, and tranverse its child
-        if parent not in reached:
-            reached.append(parent)
-            # if the node is goal, return the path
-            if parent == destination:
-                    return path
-            # tranverse all its child nodes which has not been visited, and put the paths into the frontier
-            for child in map[parent]:           
-                if child not in reached:
-                    next_path = list(path)
-                    next_path.append(child)
-                    frontier.put(next_path)
-
-def dfs(origin, destination):
-    # append origin to stack
-    stack.append([origin])
-
-    # while stack is not empty
-    while stack:
-        # pop the last path from stack
-        path = stack.pop()
-        # get the tail node from the path
-        parent = path[-1]
-
-        # if the node hasn't been visited, put it in visited list, and tranverse its child
-        if parent not in reached:
-            reached.append(parent)
-            # if the node is goal, return the path
-            if parent == destination:
-                    return path
-            # tranverse all its child nodes which has not been visited, and append the paths to the stack
-            for child in map[parent]:          
-                if child not in reached:
-                    next_path = list(path)
-                    next_path.append(child)               
-                    stack.append(next_path)
-        
-def ucs(origin, destination):
-    # put origin into priority queue
-    q.put((0,[origin]))
-
-    # while queue is not empty
-    while not q.empty():
-        # pop the path and its distance with the shortest distance from priority queue
-        distance, path = q.get()
-        # get the tail node from the path
-        parent = path[-1]
-
-        # if the node hasn't been visited, put it in visited list, and tranverse its child
-        if parent not in reached:
-            reached.append(parent)
-            # if the node is goal, return the path
-            if parent == destination:
-                    return path
-            # tranverse all its child nodes which has not been visited, 
-            # and put the paths and their cumulative distance into the priority queue
-            for child in map[parent]:          
-                if child not in reached:
-                    next_path = list(path)
-                    next_path.append(child)              
-                    cumulative_distance = distance + int(get_distance(parent, child))
-                    q.put((cumulative_distance, next_path))
-
-def a_star(origin, destination):
-    # put origin into priority queue
-    q.put((0,[origin]))
+        # while frontier is not empty
+        while frontier:
+            # pop the first node from frontier
+            stats.popped(len(frontier))
+            parent, previous = frontier.popleft()
+
+            # if the node hasn't been visited, put it in visited set, and tranverse its child
+            if parent not in reached:
+                reached.add(parent)
+                parents[parent] = previous
+                stats.expanded(parent, None, len(frontier))
+                # if the node is goal, return the path
+                if parent == destination:
+                        return self.get_path(parent)
+                # tranverse all its child nodes which has not been visited, and put them into the frontier
+                for child in graph.children(parent):
+                    if child not in reached:
+                        frontier.append((child, parent))
+                        stats.pushed += 1
+            else:
+                stats.skipped += 1
+
+    def dfs(self, origin, destination):
+        graph, stack, reached, parents, stats = self.graph, self.stack, self.reached, self.parents, self.stats
+        # append origin to stack, it is reached from nowhere
+        stack.append((origin, None))
+        stats.pushed += 1
+
+        # while stack is not empty
+        while stack:
+            # pop the last node from stack
+            stats.popped(len(stack))
+            parent, previous = stack.pop()
+
+            # if the node hasn't been visited, put it in visited set, and tranverse its child
+            if parent not in reached:
+                reached.add(parent)
+                parents[parent] = previous
+                stats.expanded(parent, None, len(stack))
+                # if the node is goal, return the path
+                if parent == destination:
+                        return self.get_path(parent)
+                # tranverse all its child nodes which has not been visited, and append them to the stack
+                for child in graph.children(parent):
+                    if child not in reached:
+                        stack.append((child, parent))
+                        stats.pushed += 1
+            else:
+                stats.skipped += 1
+
+    # A node is only pushed again when a shorter distance to it is found, which
+    # takes the place of decreasing its key: the entries it leaves behind in the
+    # heap are skipped when they are popped (lazy deletion).
+    # With no destination (None), ucs searches the whole map and leaves the
+    # shortest path tree from the origin in parents{}.
+    def ucs(self, origin, destination):
+        graph, q, reached, parents, best, counter, stats = \
+            self.graph, self.q, self.reached, self.parents, self.best, self.counter, self.stats
+        # put origin into priority queue
+        best[origin] = 0
+        heapq.heappush(q, (0, next(counter), origin, None))
+        stats.pushed += 1
+
+        # while queue is not empty
+        while q:
+            # pop the node with the shortest distance from priority queue
+            stats.popped(len(q))
+            distance, _, parent, previous = heapq.heappop(q)
+
+            # if the node hasn't been visited, put it in visited set, and tranverse its child
+            if parent not in reached:
+                reached.add(parent)
+                parents[parent] = previous
+                stats.expanded(parent, distance, len(q))
+                # if the node is goal, return the path
+                if parent == destination:
+                        return self.get_path(parent)
+                # tranverse all its child nodes which has not been visited, 
+                # and put them and their cumulative distance into the priority queue
+                # if it is shorter than any found before
+                for child, edge in graph.edges(parent):
+                    if child not in reached:
+                        cumulative_distance = distance + edge
+                        if cumulative_distance < best.get(child, cumulative_distance + 1):
+                            best[child] = cumulative_distance
+                            heapq.heappush(q, (cumulative_distance, next(counter), child, parent))
+                            stats.pushed += 1
+            else:
+                stats.skipped += 1
+
+    def a_star(self, origin, destination):
+        graph, q, reached, parents, best, counter, stats = \
+            self.graph, self.q, self.reached, self.parents, self.best, self.counter, self.stats
+        # the heuristic of every city towards the destination
+        estimate = self.snapshot.heuristic_to(origin, destination)
+        # put origin into priority queue, with the distance of its path next to
+        # its astar cost
+        best[origin] = 0
+        heapq.heappush(q, (0, next(counter), 0, origin, None))
+        stats.pushed += 1
     
-    # while queue is not empty
-    while not q.empty():
-        # pop the path and its astar cost with the shortest astar cost from priority queue
-        distance, path = q.get()
-        # get the tail node from the path
-        parent = path[-1]
-
-        # if the node hasn't been visited, put it in visited list, and tranverse its child
-        if parent not in reached:
-            reached.append(parent)
-            # if the path is not origin, then get rid of its own heuristics from its astar cost
-            # the remaining is just the cumulative cost of this path
-            if len(path) > 1:
-                distance = distance - int(heuristics[parent])
-            # if the node is goal, return the path
-            if parent == destination:
-                return path
-            # tranverse all its child nodes which has not been visited, 
-            # and put the paths and their (cumulative distance + heuristic of the last node) into the priority queue
-            for child in map[parent]:          
-                if child not in reached:
-                    next_path = list(path)
-                    next_path.append(child)
-                    cumulative_distance = distance + int(get_distance(parent, child))
-                    heuristic = int(heuristics[child])
-                    cost = cumulative_distance + heuristic
-                    q.put((cost, next_path))
-
-# an int to identify whether the input algorithm is avaliable
-valid_algorithm = 0
-
-# if number of arguments smaller than 5, print error
-if len(sys.argv) < 5:
-    print("wrong number of argument")
-else:
-    # if origin and destination both in map, run the algorithm
-    if sys.argv[3] in map and sys.argv[4] in map:
-        # call one of the four algorithms according to command line argument
-        if sys.argv[1] == "ucs":
-            solution = ucs(sys.argv[3],sys.argv[4]) 
-            valid_algorithm = 1
-        elif sys.argv[1] == "bfs":    
-            solution = bfs(sys.argv[3],sys.argv[4])  
-            valid_algorithm = 1 
-        elif sys.argv[1] == "dfs":
-            solution = dfs(sys.argv[3],sys.argv[4])
-            valid_algorithm = 1   
-        elif sys.argv[1] == "astar":
-            solution = a_star(sys.argv[3],sys.argv[4])
-            valid_algorithm = 1
-
-        # if input is ucs or bfs or dfs or astar
-        if valid_algorithm == 1:
-            # if there is a solution, call the print_path function with solution, 
+        # while queue is not empty
+        while q:
+            # pop the node with the shortest astar cost from priority queue
+            stats.popped(len(q))
+            _, _, distance, parent, previous = heapq.heappop(q)
+
+            # if the node hasn't been visited, put it in visited set, and tranverse its child
+            if parent not in reached:
+                reached.add(parent)
+                parents[parent] = previous
+                stats.expanded(parent, distance, len(q))
+                # if the node is goal, return the path
+                if parent == destination:
+                    return self.get_path(parent)
+                # tranverse all its child nodes which has not been visited, 
+                # and put them and their (cumulative distance + heuristic of the child) into the priority queue
+                # if the distance is shorter than any found before
+                for child, edge in graph.edges(parent):
+                    if child not in reached:
+                        cumulative_distance = distance + edge
+                        if cumulative_distance < best.get(child, cumulative_distance + 1):
+                            best[child] = cumulative_distance
+                            cost = cumulative_distance + estimate(child)
+                            heapq.heappush(q, (cost, next(counter), cumulative_distance, child, parent))
+                            stats.pushed += 1
+            else:
+                stats.skipped += 1
+
+    # Bidirectional searches: one search goes forward from the origin and one
+    # backward from the destination, each keeping its own parents, and the path
+    # is joined where they meet. The map is undirected, so the backward search
+    # follows the same edges, with the distance of each edge taken in the
+    # direction the path goes.
+
+    # the path from the origin through the node where the two searches meet to
+    # the destination, as city names
+    def get_joined_path(self, meet):
+        path = self.get_path(meet)
+        node = self.parents_backward[meet]
+        while node is not None:
+            path.append(self.graph.names[node])
+            node = self.parents_backward[node]
+        return path
+
+    # expand every node of one level of a bfs; returns the next level, and a node
+    # the other search has seen too, None if there is none yet
+    def bfs_level(self, level, seen, expanded, other, side):
+        graph, stats = self.graph, self.stats
+        next_level = []
+        meet = None
+        for node in level:
+            expanded.add(node)
+            stats.expanded(node, None, len(level) + len(next_level), side)
+            for child in graph.children(node):
+                if child not in seen:
+                    seen[child] = node
+                    next_level.append(child)
+                    stats.pushed += 1
+                    if meet is None and child in other:
+                        meet = child
+        return next_level, meet
+
+    # bidirectional bfs: the side with the smaller frontier grows by a whole
+    # level at a time. The first level on which the two searches meet gives a
+    # path with the fewest edges, like bfs
+    def bidirectional_bfs(self, origin, destination):
+        parents, parents_backward, stats = self.parents, self.parents_backward, self.stats
+        parents[origin] = None
+        parents_backward[destination] = None
+        if origin == destination:
+            self.reached.add(origin)
+            return self.get_path(origin)
+        forward, backward = [origin], [destination]
+        stats.pushed += 2
+        while forward and backward:
+            stats.popped(len(forward) + len(backward))
+            if len(forward) <= len(backward):
+                forward, meet = self.bfs_level(forward, parents, self.reached, parents_backward, "forward")
+            else:
+                backward, meet = self.bfs_level(backward, parents_backward, self.reached_backward, parents, "backward")
+            if meet is not None:
+                return self.get_joined_path(meet)
+
+    # bidirectional ucs (Dijkstra) and astar. The side whose heap has the smaller
+    # key is expanded. Every time a node gets a distance on one side while it has
+    # one on the other, the two make a path, and the shortest of these is kept.
+    # Without a heuristic, the search stops once the keys on top of both heaps
+    # add up to at least that shortest path, since any path not found yet is
+    # longer. With a heuristic for the forward side only (the heuristic file only
+    # gives distances to the destination, so the backward side is a plain
+    # Dijkstra search), it stops once the key on top of either heap reaches it,
+    # since every path not found yet has to go through a node of each heap. With
+    # a heuristic for each side (the landmarks give both), each side adds half
+    # the difference of the two, which is the opposite of what the other side
+    # adds, so the keys add up to path lengths and the first rule holds again.
+    def bidirectional(self, origin, destination, heuristic=None, heuristic_backward=None):
+        graph, q, q_backward, counter, stats = self.graph, self.q, self.q_backward, self.counter, self.stats
+        reached, parents, best = self.reached, self.parents, self.best
+        reached_backward, parents_backward, best_backward = \
+            self.reached_backward, self.parents_backward, self.best_backward
+        if heuristic_backward is not None:
+            forward_heuristic = heuristic
+            heuristic = lambda node: (forward_heuristic(node) - heuristic_backward(node))/2
+            backward_heuristic = lambda node: -heuristic(node)
+        else:
+            backward_heuristic = None
+        parents[origin] = None
+        parents_backward[destination] = None
+        if origin == destination:
+            reached.add(origin)
+            return self.get_path(origin)
+        best[origin] = 0
+        best_backward[destination] = 0
+        heapq.heappush(q, (heuristic(origin) if heuristic is not None else 0, next(counter), origin))
+        heapq.heappush(q_backward, (backward_heuristic(destination) if backward_heuristic is not None else 0,
+                                    next(counter), destination))
+        stats.pushed += 2
+        shortest = math.inf
+        meet = None
+        while q and q_backward:
+            if heuristic is None or backward_heuristic is not None:
+                if q[0][0] + q_backward[0][0] >= shortest:
+                    break
+            elif max(q[0][0], q_backward[0][0]) >= shortest:
+                break
+            forward = q[0][0] <= q_backward[0][0]
+            if forward:
+                heap, expanded, distances, other, tree = q, reached, best, best_backward, parents
+            else:
+                heap, expanded, distances, other, tree = q_backward, reached_backward, best_backward, best, parents_backward
+            stats.popped(len(q) + len(q_backward))
+            _, _, parent = heapq.heappop(heap)
+            # skip the entries left behind by a shorter distance
+            if parent in expanded:
+                stats.skipped += 1
+                continue
+            expanded.add(parent)
+            stats.expanded(parent, distances[parent], len(q) + len(q_backward),
+                           "forward" if forward else "backward")
+            for child, edge in graph.edges(parent):
+                if child in expanded:
+                    continue
+                if not forward:
+                    # the path goes from child to parent
+                    edge = graph.distance(child, parent)
+                cumulative_distance = distances[parent] + edge
+                if cumulative_distance < distances.get(child, math.inf):
+                    distances[child] = cumulative_distance
+                    tree[child] = parent
+                    cost = cumulative_distance
+                    if forward and heuristic is not None:
+                        cost = cost + heuristic(child)
+                    elif not forward and backward_heuristic is not None:
+                        cost = cost + backward_heuristic(child)
+                    heapq.heappush(heap, (cost, next(counter), child))
+                    stats.pushed += 1
+                    if child in other and cumulative_distance + other[child] < shortest:
+                        shortest = cumulative_distance + other[child]
+                        meet = child
+        if meet is not None:
+            return self.get_joined_path(meet)
+
+    def bidirectional_ucs(self, origin, destination):
+        return self.bidirectional(origin, destination)
+
+    def bidirectional_a_star(self, origin, destination):
+        return self.bidirectional(origin, destination, self.snapshot.heuristic_to(origin, destination),
+                                  self.snapshot.heuristic_from(origin, destination))
+
+    # ch: a bidirectional Dijkstra search that only goes up the hierarchy (see
+    # Contraction hierarchies below), from the origin on the forward edges and
+    # from the destination on the backward ones. A side stops once the key on
+    # top of its heap reaches the shortest path found, since it can only find
+    # longer ones from there.
+    def contraction_hierarchy_search(self, origin, destination):
+        q, q_backward, counter, stats = self.q, self.q_backward, self.counter, self.stats
+        reached, parents, best = self.reached, self.parents, self.best
+        reached_backward, parents_backward, best_backward = \
+            self.reached_backward, self.parents_backward, self.best_backward
+        hierarchy = self.snapshot.get_hierarchy()
+        best[origin] = 0
+        best_backward[destination] = 0
+        parents[origin] = None
+        parents_backward[destination] = None
+        heapq.heappush(q, (0, next(counter), origin))
+        heapq.heappush(q_backward, (0, next(counter), destination))
+        stats.pushed += 2
+        shortest = 0 if origin == destination else math.inf
+        meet = origin if origin == destination else None
+        sides = ((q, reached, best, best_backward, parents, hierarchy.forward),
+                 (q_backward, reached_backward, best_backward, best, parents_backward, hierarchy.backward))
+        while True:
+            # the side with the smaller key that can still find a shorter path
+            open_sides = [side for side in sides if side[0] and side[0][0][0] < shortest]
+            if not open_sides:
+                break
+            heap, expanded, distances, other, tree, edges = min(open_sides, key=lambda side: side[0][0][0])
+            stats.popped(len(q) + len(q_backward))
+            distance, _, parent = heapq.heappop(heap)
+            if parent in expanded or distance > distances[parent]:
+                stats.skipped += 1
+                continue
+            expanded.add(parent)
+            stats.expanded(parent, distance, len(q) + len(q_backward),
+                           "forward" if heap is q else "backward")
+            for child, edge in hierarchy.edges(edges, parent):
+                cumulative_distance = distance + edge
+                if cumulative_distance < distances.get(child, math.inf):
+                    distances[child] = cumulative_distance
+                    tree[child] = parent
+                    heapq.heappush(heap, (cumulative_distance, next(counter), child))
+                    stats.pushed += 1
+                    if child in other and cumulative_distance + other[child] < shortest:
+                        shortest = cumulative_distance + other[child]
+                        meet = child
+        if meet is None:
+            return None
+        # the cities of the hierarchy from the origin to the destination
+        up = []
+        node = meet
+        while node is not None:
+            up.append(node)
+            node = parents[node]
+        up.reverse()
+        node = parents_backward[meet]
+        while node is not None:
+            up.append(node)
+            node = parents_backward[node]
+        # unpack the shortcuts into the edges of the map
+        path = [up[0]]
+        for a, b in zip(up, up[1:]):
+            path += hierarchy.unpack(a, b)[1:]
+        return [self.graph.names[node] for node in path]
+
+# the search of each algorithm name of the command line
+algorithms = {"ucs": Search.ucs, "bfs": Search.bfs, "dfs": Search.dfs, "astar": Search.a_star,
+              "bibfs": Search.bidirectional_bfs, "biucs": Search.bidirectional_ucs,
+              "biastar": Search.bidirectional_a_star, "ch": Search.contraction_hierarchy_search}
+
+# Contraction hierarchies: the cities are contracted one at a time, least
+# important first. Contracting a city takes it out of the map, and every
+# shortest path that went through it is kept by a shortcut edge between two
+# of its neighbours, unless a path as short exists without it (a witness).
+# A shortest path then always climbs up the order of the cities and comes
+# back down, so a query only searches upward from both ends, which reaches
+# few cities. Every shortcut remembers the city it was made for, so the path
+# can be unpacked into the edges of the map.
+#
+#   python find_path.py contract map.txt [map.ch]     build the hierarchy
+#   python find_path.py ch map.txt origin destination [map.ch]
+#
+# The hierarchy file defaults to the map file with .ch added. It holds the
+# upward edges of every city in CSR form, like the binary map file:
+#   magic, number of cities, number of forward and of backward edges,
+#   checksum of the graph (see Graph.checksum())
+#   forward offsets int64 * (cities + 1), targets int32, weights int64,
+#   middles int32 (the city a shortcut skips, -1 for an edge of the map),
+#   then the same for the backward edges
+CH_MAGIC = b"FPCH0002"
+CH_HEADER = struct.Struct("<8sqqqq")
+
+# how many cities a witness search may settle before giving up and adding
+# the shortcut, which is never wrong, only possibly not needed
+WITNESS_LIMIT = 500
+
+class Hierarchy:
+    # forward: the edges from each city to the cities contracted after it,
+    # backward: the edges to each city from the cities contracted after it;
+    # each as (offsets, targets, weights, middles); checksum: that of the
+    # graph the hierarchy was built from
+    def __init__(self, forward, backward, checksum):
+        self.forward = forward
+        self.backward = backward
+        self.checksum = checksum
+
+    # open a hierarchy file; with a graph, raise ValueError if the file was
+    # built from another one
+    @classmethod
+    def open(cls, path, graph=None):
+        file = open(path, 'rb')
+        data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        file.close()
+        magic, cities, forward_edges, backward_edges, checksum = CH_HEADER.unpack_from(data)
+        if magic != CH_MAGIC:
+            raise ValueError(path + " is not a contraction hierarchy file, or an old one")
+        if graph is not None and (cities != len(graph.names) or checksum != graph.checksum()):
+            raise ValueError(path + " was built from another version of the map")
+        layout = []
+        for edges in (forward_edges, backward_edges):
+            layout += [("q", cities + 1), ("i", edges), ("q", edges), ("i", edges)]
+        views, _ = read_arrays(data, CH_HEADER.size, layout)
+        return cls(tuple(views[:4]), tuple(views[4:]), checksum)
+
+    def save(self, path):
+        file = open(path, 'wb')
+        file.write(CH_HEADER.pack(CH_MAGIC, len(self.forward[0]) - 1,
+                                  len(self.forward[1]), len(self.backward[1]), self.checksum))
+        write_arrays(file, self.forward + self.backward)
+        file.close()
+
+    # the upward edges of a city with their distances, in one direction
+    def edges(self, side, node):
+        offsets, targets, weights, _ = side
+        start, end = offsets[node], offsets[node+1]
+        return zip(targets[start:end], weights[start:end])
+
+    # the city the edge from a to b skips, -1 if it is an edge of the map
+    def middle(self, a, b):
+        offsets, targets, _, middles = self.forward
+        for i in range(offsets[a], offsets[a+1]):
+            if targets[i] == b:
+                return middles[i]
+        offsets, targets, _, middles = self.backward
+        for i in range(offsets[b], offsets[b+1]):
+            if targets[i] == a:
+                return middles[i]
+        return -1
+
+    # the cities of the map between a and b, a and b included
+    def unpack(self, a, b):
+        path = [a]
+        edges = [(a, b)]
+        while edges:
+            a, b = edges.pop()
+            middle = self.middle(a, b)
+            if middle < 0:
+                path.append(b)
+            else:
+                edges.append((middle, b))
+                edges.append((a, middle))
+        return path
+
+# search from u for the cities in targets, without going through skip, as far
+# as limit; returns the distances found
+def witness_search(out, u, skip, targets, limit):
+    distances = {u: 0}
+    heap = [(0, u)]
+    settled = 0
+    left = set(targets)
+    while heap and left and settled < WITNESS_LIMIT:
+        distance, node = heapq.heappop(heap)
+        if distance > distances[node]:
+            continue
+        if distance > limit:
+            break
+        settled += 1
+        left.discard(node)
+        for child, edge in out[node].items():
+            if child == skip:
+                continue
+            cumulative_distance = distance + edge
+            if cumulative_distance < distances.get(child, math.inf):
+                distances[child] = cumulative_distance
+                heapq.heappush(heap, (cumulative_distance, child))
+    return distances
+
+# the shortcuts contracting v needs, as (u, x, distance) for the edges
+# u -> v -> x that have no witness
+def shortcuts(out, inn, v):
+    needed = []
+    for u, edge_in in inn[v].items():
+        targets = [x for x in out[v] if x != u]
+        if not targets:
+            continue
+        limit = edge_in + max(out[v][x] for x in targets)
+        distances = witness_search(out, u, v, targets, limit)
+        for x in targets:
+            distance = edge_in + out[v][x]
+            if distances.get(x, math.inf) > distance:
+                needed.append((u, x, distance))
+    return needed
+
+# build the contraction hierarchy of a graph
+def contract(graph):
+    cities = len(graph.names)
+    # the edges between the cities not contracted yet, out[u][v] and
+    # inn[v][u] being the distance from u to v
+    out = [{} for _ in range(cities)]
+    inn = [{} for _ in range(cities)]
+    for u in range(cities):
+        for v, edge in graph.edges(u):
+            if v != u and edge < out[u].get(v, math.inf):
+                out[u][v] = edge
+                inn[v][u] = edge
+    # (u, x) -> the city a shortcut from u to x skips
+    middles = {}
+    # the number of neighbours of each city contracted so far, which spreads
+    # the contraction evenly over the map
+    deleted = [0]*cities
+
+    # the shortcuts contracting each city needs, and the number of cities
+    # contracted when they were worked out. They only set the order until the
+    # city comes off the heap, and are worked out again then if any city has
+    # been contracted since: a witness may have gone through it, and not only
+    # when it was a neighbour. Nearly every pop follows a contraction, so in
+    # practice the shortcuts of every city are worked out again when it is
+    # contracted, on top of the first time; only the priorities of the cities
+    # still on the heap are left to go stale. This is what makes contracting
+    # slow (about 23 s for a 100x100 grid), but a list kept from earlier may
+    # miss shortcuts
+    needed = [shortcuts(out, inn, v) for v in range(cities)]
+    worked_out = [0]*cities
+    done = 0
+
+    # cities that need fewer shortcuts than the edges they take away go first
+    def priority(v):
+        return len(needed[v]) - len(out[v]) - len(inn[v]) + deleted[v]
+
+    heap = [(priority(v), v) for v in range(cities)]
+    heapq.heapify(heap)
+    contracted = [False]*cities
+    upward_out = [None]*cities
+    upward_in = [None]*cities
+    while heap:
+        _, v = heapq.heappop(heap)
+        if contracted[v]:
+            continue
+        if worked_out[v] < done:
+            # the priority may have gone up since v was pushed; if v is no
+            # longer the least important city, put it back
+            needed[v] = shortcuts(out, inn, v)
+            worked_out[v] = done
+            current = priority(v)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, v))
+                continue
+        for u, x, distance in needed[v]:
+            if distance < out[u].get(x, math.inf):
+                out[u][x] = distance
+                inn[x][u] = distance
+                middles[(u, x)] = v
+        needed[v] = None
+        # the edges v has left all go to cities contracted after it
+        upward_out[v] = [(x, edge, middles.get((v, x), -1)) for x, edge in out[v].items()]
+        upward_in[v] = [(u, edge, middles.get((u, v), -1)) for u, edge in inn[v].items()]
+        for u in inn[v]:
+            del out[u][v]
+            deleted[u] += 1
+        for x in out[v]:
+            del inn[x][v]
+            deleted[x] += 1
+        out[v] = {}
+        inn[v] = {}
+        contracted[v] = True
+        done += 1
+
+    def csr(upward):
+        offsets = array("q", [0])
+        targets = array("i")
+        weights = array("q")
+        middle = array("i")
+        for edges in upward:
+            for target, weight, skipped in edges:
+                targets.append(target)
+                weights.append(weight)
+                middle.append(skipped)
+            offsets.append(len(targets))
+        return (offsets, targets, weights, middle)
+
+    return Hierarchy(csr(upward_out), csr(upward_in), graph.checksum())
+
+# Landmarks (ALT): the distances from and to a few landmark cities, worked
+# out once, give a lower bound on the distance between any two cities by the
+# triangle inequality: d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) -
+# d(t, L) for every landmark L. astar uses the largest of these bounds as its
+# heuristic when no heuristic file is given, so it works for any destination.
+# Landmarks are picked far from each other: each one is the city farthest
+# from the landmarks picked before it.
+#
+#   python find_path.py landmarks map.txt [map.alt] [--count 8]
+#
+# The landmark file defaults to the map file with .alt added:
+#   magic, number of cities, number of landmarks, checksum of the graph
+#   landmarks int32 * landmarks
+#   for every landmark, d(L, v) int64 * cities, then d(v, L) int64 * cities,
+#   -1 where there is no path
+ALT_MAGIC = b"FPALT002"
+ALT_HEADER = struct.Struct("<8sqqq")
+
+# how many of the landmarks a query uses, the ones giving the largest bound
+# between its origin and destination
+ACTIVE_LANDMARKS = 4
+
+class Landmarks:
+    # cities and checksum: those of the graph the landmarks were picked on
+    def __init__(self, landmarks, from_landmark, to_landmark, cities, checksum):
+        self.landmarks = landmarks
+        # from_landmark[i][v] = d(landmarks[i], v), to_landmark[i][v] = d(v, landmarks[i])
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+        self.cities = cities
+        self.checksum = checksum
+
+    # open a landmark file; with a graph, raise ValueError if the file was
+    # made for another one
+    @classmethod
+    def open(cls, path, graph=None):
+        file = open(path, 'rb')
+        data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        file.close()
+        magic, cities, count, checksum = ALT_HEADER.unpack_from(data)
+        if magic != ALT_MAGIC:
+            raise ValueError(path + " is not a landmark file, or an old one")
+        if graph is not None and (cities != len(graph.names) or checksum != graph.checksum()):
+            raise ValueError(path + " was made for another version of the map")
+        views, _ = read_arrays(data, ALT_HEADER.size,
+                               [("i", count)] + [("q", cities)]*(2*count))
+        return cls(views[0], views[1::2], views[2::2], cities, checksum)
+
+    def save(self, path):
+        file = open(path, 'wb')
+        file.write(ALT_HEADER.pack(ALT_MAGIC, self.cities, len(self.landmarks), self.checksum))
+        parts = [array("i", self.landmarks)]
+        for i in range(len(self.landmarks)):
+            parts += [array("q", self.from_landmark[i]), array("q", self.to_landmark[i])]
+        write_arrays(file, parts)
+        file.close()
+
+    # a function giving a lower bound on d(x, y) for any city v put in place
+    # of x (towards=True, y being the destination) or of y (towards=False, x
+    # being the origin), from the landmarks that bound d(origin, destination)
+    # best
+    def estimate(self, origin, destination, towards=True):
+        def bound(i, x, y):
+            # the bound landmark i gives on d(x, y), 0 if it gives none
+            from_l, to_l = self.from_landmark[i], self.to_landmark[i]
+            value = 0
+            if from_l[x] >= 0 and from_l[y] >= 0:
+                value = max(value, from_l[y] - from_l[x])
+            if to_l[x] >= 0 and to_l[y] >= 0:
+                value = max(value, to_l[x] - to_l[y])
+            return value
+
+        active = sorted(range(len(self.landmarks)),
+                        key=lambda i: -bound(i, origin, destination))[:ACTIVE_LANDMARKS]
+        fixed = destination if towards else origin
+        # for each active landmark, d(L, fixed) and d(fixed, L) and the arrays
+        terms = [(self.from_landmark[i], self.to_landmark[i],
+                  self.from_landmark[i][fixed], self.to_landmark[i][fixed]) for i in active]
+
+        if towards:
+            # d(v, t) >= d(L, t) - d(L, v) and d(v, L) - d(t, L)
+            def estimate(v):
+                value = 0
+                for from_l, to_l, l_t, t_l in terms:
+                    if l_t >= 0 and from_l[v] >= 0 and l_t - from_l[v] > value:
+                        value = l_t - from_l[v]
+                    if t_l >= 0 and to_l[v] >= 0 and to_l[v] - t_l > value:
+                        value = to_l[v] - t_l
+                return value
+        else:
+            # d(s, v) >= d(L, v) - d(L, s) and d(s, L) - d(v, L)
+            def estimate(v):
+                value = 0
+                for from_l, to_l, l_s, s_l in terms:
+                    if l_s >= 0 and from_l[v] >= 0 and from_l[v] - l_s > value:
+                        value = from_l[v] - l_s
+                    if s_l >= 0 and to_l[v] >= 0 and s_l - to_l[v] > value:
+                        value = s_l - to_l[v]
+                return value
+        return estimate
+
+# the distances from a city to every city (or, with reverse, from every city
+# to it) as an array, -1 where there is no path
+def distances_from(graph, source, reverse_weights=None):
+    distances = array("q", [-1])*len(graph.names)
+    distances[source] = 0
+    heap = [(0, source)]
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if distance > distances[node]:
+            continue
+        start, end = graph.offsets[node], graph.offsets[node+1]
+        weights = graph.weights if reverse_weights is None else reverse_weights
+        for i in range(start, end):
+            child = graph.targets[i]
+            cumulative_distance = distance + weights[i]
+            if distances[child] < 0 or cumulative_distance < distances[child]:
+                distances[child] = cumulative_distance
+                heapq.heappush(heap, (cumulative_distance, child))
+    return distances
+
+# pick count landmarks of a graph and work out their distances
+def pick_landmarks(graph, count):
+    cities = len(graph.names)
+    # the distance of the edge from each neighbour entry's city back to the
+    # city owning the entry, to search towards a landmark
+    reverse_weights = array("q", graph.weights)
+    for u in range(cities):
+        for i in range(graph.offsets[u], graph.offsets[u+1]):
+            reverse_weights[i] = graph.distance(graph.targets[i], u)
+    landmarks = []
+    from_landmark = []
+    to_landmark = []
+    # the distance from the nearest landmark to each city, -1 if none reaches
+    # it; the distances from city 0 stand in until there is a landmark
+    nearest = distances_from(graph, 0) if cities else []
+    while len(landmarks) < min(count, cities):
+        # the city farthest from the landmarks, among those they reach
+        landmark = max((v for v in range(cities) if v not in landmarks),
+                       key=lambda v: (nearest[v] >= 0, nearest[v]))
+        from_l = distances_from(graph, landmark)
+        if not landmarks:
+            nearest = from_l
+        landmarks.append(landmark)
+        from_landmark.append(from_l)
+        to_landmark.append(distances_from(graph, landmark, reverse_weights))
+        nearest = array("q", (d if n < 0 or 0 <= d < n else n for n, d in zip(nearest, from_l)))
+    return Landmarks(landmarks, from_landmark, to_landmark, cities, graph.checksum())
+
+# Route cache: the routes found so far, by algorithm, origin and destination,
+# with the least recently used ones dropped once there are too many. The
+# routes of the searches that are exact, that is sure to find a shortest
+# path, also answer the exact queries between any two cities along them,
+# since every part of a shortest path is a shortest path too. The server uses
+# one; it is emptied, and the map and heuristics loaded again, when the map
+# file changes. Every query gives the generation of the map it runs on, and
+# the cache only keeps and answers the routes of the current one, so a search
+# still running on the old map leaves nothing behind. A lock keeps it whole
+# when several threads share a router.
+
+# the algorithms whose routes are shortest paths; astar and biastar only
+# without a heuristic file, which is only right for one destination and may
+# lead them to a longer path (see Router.exact())
+optimal_algorithms = ("ucs", "astar", "biucs", "biastar", "ch")
+
+class RouteCache:
+    def __init__(self, max_routes=10000, max_nodes=1000000):
+        self.max_routes = max_routes
+        # the most cities all the cached routes may hold together
+        self.max_nodes = max_nodes
+        # (algorithm, origin, destination) -> path, None if there is no route,
+        # from the least to the most recently used
+        self.routes = OrderedDict()
+        # city -> keys of the cached shortest paths through it
+        self.through = {}
+        self.nodes = 0
+        self.hits = 0
+        self.subpath_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # the generation of the map of the cached routes, see clear()
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    # returns (True, path) for a cached route, (False, None) otherwise; only
+    # an exact query may be answered with a part of another route
+    def get(self, algorithm, origin, destination, exact=False, generation=0):
+        with self.lock:
+            key = (algorithm, origin, destination)
+            if generation != self.generation:
+                self.misses += 1
+                return False, None
+            if key in self.routes:
+                self.routes.move_to_end(key)
+                self.hits += 1
+                return True, self.routes[key]
+            if exact:
+                path = self.subpath(origin, destination)
+                if path is not None:
+                    self.subpath_hits += 1
+                    return True, path
+            self.misses += 1
+            return False, None
+
+    # the part from origin to destination of a cached shortest path, None if
+    # no cached shortest path goes through both in that order
+    def subpath(self, origin, destination):
+        keys = self.through.get(origin)
+        others = self.through.get(destination)
+        if not keys or not others:
+            return None
+        if len(others) < len(keys):
+            keys, others = others, keys
+        for key in keys:
+            if key in others:
+                path = self.routes[key]
+                i, j = path.index(origin), path.index(destination)
+                if i <= j:
+                    self.routes.move_to_end(key)
+                    return path[i:j+1]
+        return None
+
+    # exact tells whether the path is sure to be a shortest one, which makes
+    # its parts answers to other queries; the routes of another generation
+    # than the current one are not kept
+    def put(self, algorithm, origin, destination, path, exact=False, generation=0):
+        with self.lock:
+            key = (algorithm, origin, destination)
+            if generation != self.generation or key in self.routes:
+                return
+            self.routes[key] = path
+            if path:
+                self.nodes += len(path)
+                if exact:
+                    for city in path:
+                        self.through.setdefault(city, set()).add(key)
+            # drop the least recently used routes
+            while len(self.routes) > self.max_routes or self.nodes > self.max_nodes:
+                old_key, old_path = self.routes.popitem(last=False)
+                self.evictions += 1
+                if old_path:
+                    self.nodes -= len(old_path)
+                    for city in old_path:
+                        keys = self.through.get(city)
+                        if keys is not None:
+                            keys.discard(old_key)
+                            if not keys:
+                                del self.through[city]
+
+    # empty the cache for the routes of a new generation of the map
+    def clear(self, generation=None):
+        with self.lock:
+            self.generation = self.generation + 1 if generation is None else generation
+            self.routes.clear()
+            self.through.clear()
+            self.nodes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.subpath_hits + self.misses
+        return {
+            "routes": len(self.routes),
+            "nodes": self.nodes,
+            "hits": self.hits,
+            "subpath_hits": self.subpath_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.subpath_hits)/lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Snapshot: one version of the map of a router, with its heuristics and the
+# hierarchy and landmarks made for it. A query takes the router's snapshot
+# once and runs on it to the end, so when the router loads the map again
+# (Router.check_map()) the searches already running keep the map, heuristics,
+# hierarchy and landmarks they started with, and never mix them with the new
+# ones. Nothing of a snapshot changes after it is made, except that the
+# hierarchy and landmarks are opened on the first query that needs them.
+class Snapshot:
+    def __init__(self, graph, heuristics=None, hierarchy_path=None, landmark_path=None,
+                 signature=None, generation=0):
+        self.graph = graph
+        # city id -> heuristic value, None if there is no heuristic file
+        self.heuristics = heuristics
+        # the hierarchy and landmarks, opened from their files on the first
+        # query that needs them; landmarks is False if there is no file
+        self.hierarchy_path = hierarchy_path
+        self.hierarchy = None
+        self.landmark_path = landmark_path
+        self.landmarks = None
+        # the signature of the map file it was loaded from, None if it was
+        # not, and its generation in the route cache
+        self.signature = signature
+        self.generation = generation
+        self.lock = threading.Lock()
+
+    # the hierarchy for ch; ValueError if there is no hierarchy file, or it
+    # was built from another version of the map
+    def get_hierarchy(self):
+        with self.lock:
+            if self.hierarchy is None:
+                if self.hierarchy_path is None or not os.path.exists(self.hierarchy_path):
+                    raise ValueError("no hierarchy file %s, run the contract command" % self.hierarchy_path)
+                try:
+                    self.hierarchy = Hierarchy.open(self.hierarchy_path, self.graph)
+                except ValueError as error:
+                    raise ValueError("%s, run the contract command again" % error)
+            return self.hierarchy
+
+    def get_landmarks(self):
+        with self.lock:
+            if self.landmarks is None:
+                self.landmarks = False
+                if self.landmark_path is not None and os.path.exists(self.landmark_path):
+                    # a landmark file of another version of the map would
+                    # give bounds that are too high, and longer paths
+                    try:
+                        self.landmarks = Landmarks.open(self.landmark_path, self.graph)
+                    except ValueError as error:
+                        sys.stderr.write("%s, not using it; run the landmarks command again\n" % error)
+            return self.landmarks
+
+    # the heuristic of astar towards the destination: the heuristic file if
+    # there is one (0 for the cities it leaves out), otherwise the landmark
+    # bound, otherwise 0, which makes astar a ucs
+    def heuristic_to(self, origin, destination):
+        heuristics = self.heuristics
+        if heuristics is not None:
+            return lambda node: heuristics.get(node, 0)
+        landmarks = self.get_landmarks()
+        if landmarks:
+            return landmarks.estimate(origin, destination)
+        return lambda node: 0
+
+    # the heuristic of the backward half of biastar, a lower bound on the
+    # distance from the origin; only the landmarks give one
+    def heuristic_from(self, origin, destination):
+        if self.heuristics is None:
+            landmarks = self.get_landmarks()
+            if landmarks:
+                return landmarks.estimate(origin, destination, towards=False)
+        return None
+
+    # whether the algorithm is sure to find a shortest path on this map
+    def exact(self, algorithm):
+        if algorithm in ("astar", "biastar") and self.heuristics is not None:
+            return False
+        return algorithm in optimal_algorithms
+
+# Router: the Snapshot of the map the queries run on, and the route cache.
+# Importing find_path only defines what is here, so it can be used as a
+# library; every query runs a Search of its own, and one router can answer
+# queries from several threads at the same time.
+#
+#   import find_path
+#   router = find_path.Router.open("map.txt")
+#   router.route("ucs", "A", "B")      the path as city names, None if none
+#   router.answer("ucs", "A", "B")     what the command line prints, and
+#                                      the Search, None if nothing was searched
+class Router:
+    def __init__(self, graph, heuristics=None, hierarchy_path=None, landmark_path=None, cache=None):
+        # the current Snapshot, replaced as a whole when the map is loaded again
+        self.snapshot = Snapshot(graph, heuristics, hierarchy_path, landmark_path)
+        # the RouteCache, None to search every query
+        self.cache = cache
+        # the Latencies of the queries served
+        self.latencies = Latencies()
+        # the files the router was opened from, to load them again in check_map()
+        self.map_path = None
+        self.heuristic_path = None
+        self.lock = threading.Lock()
+
+    # open a map file, or a binary graph file, with its heuristic file if
+    # there is one; the hierarchy and landmarks default to the map file with
+    # .ch and .alt added
+    @classmethod
+    def open(cls, map_path, heuristic_path=None, hierarchy_path=None, landmark_path=None, cache=None):
+        signature = map_signature(map_path)
+        graph = Graph.open(map_path)
+        heuristics = load_heuristics(graph, heuristic_path) if heuristic_path is not None else None
+        router = cls(graph, heuristics, hierarchy_path or map_path + ".ch",
+                     landmark_path or map_path + ".alt", cache)
+        router.map_path = map_path
+        router.heuristic_path = heuristic_path
+        router.snapshot.signature = signature
+        return router
+
+    # the map of the current snapshot
+    @property
+    def graph(self):
+        return self.snapshot.graph
+
+    # load the map and heuristics again, in a new snapshot, and empty the
+    # cache if the map file has changed since it was loaded; the searches
+    # already running keep the snapshot they started with
+    def check_map(self):
+        if self.map_path is None:
+            return
+        signature = map_signature(self.map_path)
+        with self.lock:
+            old = self.snapshot
+            if signature == old.signature:
+                return
+            graph = Graph.open(self.map_path)
+            heuristics = None
+            if self.heuristic_path is not None:
+                heuristics = load_heuristics(graph, self.heuristic_path)
+            # the hierarchy and landmarks are opened again on the next query
+            # that needs them
+            snapshot = Snapshot(graph, heuristics, old.hierarchy_path, old.landmark_path,
+                                signature, old.generation + 1)
+            # the cache moves on to the new generation before any query can
+            # take the new snapshot
+            if self.cache is not None:
+                self.cache.clear(snapshot.generation)
+            self.snapshot = snapshot
+
+    # run the search of an algorithm between two cities of the map, given by
+    # name; returns the Search, with the path it found in path
+    def search(self, algorithm, origin, destination, trace=None, snapshot=None):
+        search = Search(snapshot or self.snapshot, trace)
+        # the searches work on the ids of the cities
+        search.run(algorithm, search.graph.id(origin), search.graph.id(destination))
+        return search
+
+    # the path the algorithm finds between two cities of the map, as city
+    # names, None if there is none, and the Search, None if the path came
+    # from the cache
+    def find(self, algorithm, origin, destination, trace=None, snapshot=None):
+        snapshot = snapshot or self.snapshot
+        cache = self.cache
+        exact = snapshot.exact(algorithm)
+        if cache is not None:
+            found, path = cache.get(algorithm, origin, destination, exact, snapshot.generation)
+            if found:
+                return path, None
+        search = self.search(algorithm, origin, destination, trace, snapshot)
+        if cache is not None:
+            cache.put(algorithm, origin, destination, search.path, exact, snapshot.generation)
+        return search.path, search
+
+    # the path the algorithm finds between two cities of the map, as city
+    # names, None if there is none
+    def route(self, algorithm, origin, destination):
+        if algorithm not in algorithms:
+            raise ValueError("unsupported search algorithm " + algorithm)
+        snapshot = self.snapshot
+        for city in (origin, destination):
+            if city not in snapshot.graph:
+                raise KeyError(city)
+        return self.find(algorithm, origin, destination, snapshot=snapshot)[0]
+
+    # run one query and return what the command line prints for it, and the
+    # Search that answered it, None if nothing was searched
+    def answer(self, algorithm, origin, destination, trace=None):
+        # the whole query, formatting included, runs on one snapshot
+        snapshot = self.snapshot
+        graph = snapshot.graph
+        # if origin and destination both in map, run the algorithm
+        if origin in graph and destination in graph:
+            # if input is not one of the algorithms, print "unsupported search algorithm"  
+            if algorithm not in algorithms:
+                return "unsupported search algorithm", None
+            try:
+                solution, search = self.find(algorithm, origin, destination, trace, snapshot)
+            except ValueError as error:
+                # ch without a usable hierarchy file
+                return str(error), None
+            # if there is a solution, format it,
             # otherwise, the destination cannot be reached from origin
             if solution:
-                print_path(solution)
-            else:
-                print("distance: infinity")
-                print("path:")
-                print("none")
-        # if input is not ucs or bfs or dfs or astar, print "unsupported search algorithm"  
+                return format_path(graph, solution), search
+            return "distance: infinity\npath:\nnone", search
+        # if origin or destination is not in map, print error
+        lines = []
+        if origin not in graph:
+            lines.append("Point of origin not in map")
+        if destination not in graph:
+            lines.append("Point of destination not in map")
+        return "\n".join(lines), None
+
+# what a map file looks like, to tell when it changes
+def map_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Server mode: the map and heuristics are loaded once, then queries are read
+# one per line as "algorithm origin destination" and answered in the format
+# of the command line, followed by an empty line. The time each query took is
+# written to stderr.
+#
+#   python find_path.py serve map.txt [heuristic.txt]                  stdin/stdout
+#   python find_path.py serve map.txt [heuristic.txt] --socket PATH    unix socket
+#   python find_path.py serve map.txt [heuristic.txt] --port PORT      tcp on localhost
+#
+# Routes are cached, see RouteCache; --cache N keeps at most N routes, and
+# --cache 0 turns the cache off.
+
+# the latencies of the queries a server answered: their number and sum, and
+# a histogram of buckets 1% wide from 1 microsecond up for the median and
+# the 99th percentile, so that the memory it takes stays the same however
+# many queries there are. A lock keeps it whole when several threads add to it.
+class Latencies:
+    # the ratio between the bounds of a bucket, and the bound of the first
+    RATIO = 1.01
+    SMALLEST = 0.001
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        # bucket -> number of latencies in it
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    # add the latency of a query, in milliseconds, and return the number of
+    # queries so far
+    def add(self, latency):
+        bucket = 0
+        if latency > self.SMALLEST:
+            bucket = int(math.log(latency/self.SMALLEST, self.RATIO))
+        with self.lock:
+            self.count += 1
+            self.total += latency
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+            return self.count
+
+    # the latency below which the given fraction of the queries fall, to
+    # within 1%: the middle of the bucket holding it
+    def quantile(self, fraction):
+        rank = min(self.count - 1, int(self.count*fraction))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                break
+        return self.SMALLEST*self.RATIO**(bucket + 0.5)
+
+    # the number of queries and their mean, median and 99th percentile latency
+    def summary(self):
+        with self.lock:
+            if not self.count:
+                return "no queries"
+            return "%d queries, mean %.3f ms, median %.3f ms, p99 %.3f ms" % (
+                self.count, self.total/self.count, self.quantile(0.5), self.quantile(0.99))
+
+# answer one query line, and log how long it took
+def serve_query(router, line):
+    query = line.split()
+    start = time.perf_counter()
+    router.check_map()
+    search = None
+    if len(query) != 3:
+        text = "wrong number of argument"
+    else:
+        text, search = router.answer(*query)
+    latency = (time.perf_counter() - start)*1000
+    count = router.latencies.add(latency)
+    sys.stderr.write("query %d: %s %.3f ms, %d nodes expanded\n" % (
+        count, " ".join(query), latency, search.nodes_expanded() if search else 0))
+    return text + "\n\n"
+
+# answer the queries of one client; the searches run in threads, so a long
+# search of one client does not hold up the others
+async def handle_client(router, reader, writer):
+    import asyncio
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        text = await asyncio.to_thread(serve_query, router, line.decode("utf-8"))
+        writer.write(text.encode("utf-8"))
+        await writer.drain()
+    writer.close()
+
+async def serve_stdin(router):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        sys.stdout.write(serve_query(router, line.decode("utf-8")))
+        sys.stdout.flush()
+
+async def serve_socket(router, option, address):
+    import asyncio
+    client = lambda reader, writer: handle_client(router, reader, writer)
+    if option == "--socket":
+        server = await asyncio.start_unix_server(client, path=address)
+    else:
+        server = await asyncio.start_server(client, "127.0.0.1", int(address))
+    async with server:
+        await server.serve_forever()
+
+# asyncio, and multiprocessing for batch(), are only imported when they are
+# used, which keeps importing find_path quick
+def serve(router, arguments):
+    import asyncio
+    size = 10000
+    if "--cache" in arguments:
+        size = int(arguments[arguments.index("--cache") + 1])
+    if size > 0:
+        router.cache = RouteCache(size)
+    try:
+        if "--socket" in arguments or "--port" in arguments:
+            option = "--socket" if "--socket" in arguments else "--port"
+            asyncio.run(serve_socket(router, option, arguments[arguments.index(option) + 1]))
         else:
-            print("unsupported search algorithm")
-    # if origin or destination is not in map, print error
+            asyncio.run(serve_stdin(router))
+    except KeyboardInterrupt:
+        pass
+    sys.stderr.write(router.latencies.summary() + "\n")
+    if router.cache is not None:
+        sys.stderr.write("cache: %s\n" % ", ".join(
+            "%s %s" % (name, round(value, 3)) for name, value in router.cache.stats().items()))
+
+# Batch mode: routes for many origin/destination pairs, read one pair per
+# line from a file. The pairs are grouped by origin, and each origin is
+# searched once with ucs over the whole map; every destination is then
+# answered from the shortest path tree of its origin. The origins are
+# spread over a pool of worker processes. The answers are printed in the
+# order of the pairs, each followed by an empty line.
+#
+#   python find_path.py batch map.txt pairs.txt [--workers N]
+
+# the router of the batch being answered; the workers are forked, so they
+# start with it and its map already loaded
+batch_router = None
+
+# the answers of ucs from one origin to many destinations
+def answer_from_origin(origin, destinations):
+    router = batch_router
+    snapshot = router.snapshot
+    graph = snapshot.graph
+    if origin not in graph:
+        return [router.answer("ucs", origin, destination)[0] for destination in destinations]
+    # the paths ucs finds to each destination are the ones of the tree: up
+    # to the destination, the search of the whole map pops the same nodes in
+    # the same order
+    search = Search(snapshot)
+    search.ucs(graph.id(origin), None)
+    texts = []
+    for destination in destinations:
+        node = graph.id(destination)
+        if node is None:
+            texts.append("Point of destination not in map")
+        elif node in search.reached:
+            texts.append(format_path(graph, search.get_path(node)))
+        else:
+            texts.append("distance: infinity\npath:\nnone")
+    return texts
+
+# answer a list of (origin, destination) pairs, in their order
+def batch(router, pairs, workers=None):
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    global batch_router
+    batch_router = router
+    # the destinations of each origin, with the positions of their pairs
+    groups = {}
+    for i, (origin, destination) in enumerate(pairs):
+        groups.setdefault(origin, []).append((i, destination))
+    origins = list(groups)
+    destinations = [[destination for _, destination in groups[origin]] for origin in origins]
+    parallel = workers != 1 and len(origins) > 1 and \
+        "fork" in multiprocessing.get_all_start_methods()
+    if parallel:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            results = list(pool.map(answer_from_origin, origins, destinations,
+                                    chunksize=max(1, len(origins)//64)))
     else:
-        if sys.argv[3] not in map:
-            print("Point of origin not in map")
-        if sys.argv[4] not in map:
-            print("Point of destination not in map")
\ No newline at end of file
+        results = list(map(answer_from_origin, origins, destinations))
+    answers = [None]*len(pairs)
+    for origin, texts in zip(origins, results):
+        for (i, _), text in zip(groups[origin], texts):
+            answers[i] = text
+    return answers
+
+def run_batch(router, arguments):
+    workers = None
+    if "--workers" in arguments:
+        workers = int(arguments[arguments.index("--workers") + 1])
+    lines = []
+    file3 = open(arguments[0], 'r')
+    for line in file3:
+        if line.strip():
+            lines.append(line.split())
+    file3.close()
+    answers = iter(batch(router, [line for line in lines if len(line) == 2], workers))
+    for line in lines:
+        print(next(answers) if len(line) == 2 else "wrong number of argument")
+        print()
+
+# the landmarks command: pick the landmarks and save them
+def run_landmarks(map_path, arguments):
+    count = 8
+    if "--count" in arguments:
+        i = arguments.index("--count")
+        count = int(arguments[i + 1])
+        del arguments[i:i + 2]
+    pick_landmarks(Graph.open(map_path), count).save(arguments[0] if arguments else map_path + ".alt")
+
+# the command line:
+#   python find_path.py algorithm map.txt origin destination [heuristic.txt]
+# and the save, contract, landmarks, serve and batch commands above
+def main(argv=None):
+    argv = list(sys.argv if argv is None else argv)
+
+    # how to report the statistics of a query: None, "text" or "json"
+    stats_format = None
+    trace = None
+    # take the statistics options out of the arguments
+    if "--stats" in argv:
+        argv.remove("--stats")
+        stats_format = "text"
+    if "--stats-json" in argv:
+        argv.remove("--stats-json")
+        stats_format = "json"
+    if "--trace" in argv:
+        i = argv.index("--trace")
+        trace = open(argv[i + 1], 'w')
+        del argv[i:i + 2]
+
+    # save a map file as a binary graph file, which can then be given in place of
+    # the map file:  python find_path.py save map.txt map.bin
+    # The map file may be compressed (map.txt.gz or map.txt.xz); how far the
+    # reading has got is written to stderr.
+    if len(argv) == 4 and argv[1] == "save":
+        Graph.load(argv[2], sys.stderr).save(argv[3])
+        return
+    if len(argv) < 3:
+        print("wrong number of argument")
+        return
+    map_path = argv[2]
+    if argv[1] == "contract":
+        contract(Graph.open(map_path)).save(argv[3] if len(argv) > 3 else map_path + ".ch")
+        return
+    if argv[1] == "landmarks":
+        run_landmarks(map_path, argv[3:])
+        return
+
+    # process the heuristic file
+    # if the command line argument has six or more argument, then the [5] argument is heuristic file,
+    # in server mode it is the [3] argument; for ch the [5] argument is the hierarchy file
+    heuristic_path = None
+    hierarchy_path = None
+    if argv[1] == "serve":
+        if len(argv) > 3 and not argv[3].startswith("--"):
+            heuristic_path = argv[3]
+    elif argv[1] == "ch" and len(argv) > 5:
+        hierarchy_path = argv[5]
+    elif argv[1] != "batch" and len(argv) > 5:
+        heuristic_path = argv[5]
+    load_started = time.perf_counter()
+    router = Router.open(map_path, heuristic_path, hierarchy_path)
+    load_time = time.perf_counter() - load_started
+
+    if argv[1] == "serve":
+        serve(router, argv[3:])
+    elif argv[1] == "batch":
+        run_batch(router, argv[3:])
+    # if number of arguments smaller than 5, print error
+    elif len(argv) < 5:
+        print("wrong number of argument")
+    else:
+        started = time.perf_counter()
+        text, search = router.answer(argv[1], argv[3], argv[4], trace)
+        print(text)
+        stats = search.stats if search is not None else SearchStats()
+        search_time = stats.phases.get("search", 0)
+        # the time answer() took besides the search is formatting the path
+        stats.phases = {"load": load_time, "search": search_time,
+                        "print": time.perf_counter() - started - search_time}
+        expanded = search.nodes_expanded() if search is not None else 0
+        # with --stats, the number of nodes expanded goes to stderr, so the
+        # output stays the same; compare e.g. ucs with biucs on the same query
+        if stats_format == "json":
+            result = {"algorithm": argv[1], "nodes_expanded": expanded}
+            result.update(stats.as_dict())
+            sys.stderr.write(json.dumps(result) + "\n")
+        elif stats_format == "text":
+            sys.stderr.write("nodes expanded: %d\n" % expanded)
+            sys.stderr.write(stats.format() + "\n")
+    if trace is not None:
+        trace.close()
+
+if __name__ == "__main__":
+    main()
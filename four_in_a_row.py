@@ -1,5 +1,1036 @@
 # use math library if needed
+import bisect
+import functools
+import inspect
+import json
 import math
+import mmap
+import multiprocessing
+import random
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# the weights of the evaluate() scores, see evaluate()
+_WEIGHTS = [0, 1, 4, 16, 1000]
+
+
+def _contribution(code):
+    # score of one 4-slot segment for PLAYER1, where code is
+    # (discs of PLAYER1) + 5*(discs of PLAYER2) in the segment
+    mine, theirs = code % 5, code // 5
+    if theirs == 0:
+        return _WEIGHTS[mine]
+    if mine == 0:
+        return -_WEIGHTS[theirs]
+    return 0
+
+
+# _DELTAS[side][code] is the change of the score of a segment with the given
+# code when side drops a disc in it; codes only go up to 4 + 5*4
+_CODE_STEP = (1, 5)
+_DELTAS = tuple(
+    [_contribution(code + step) - _contribution(code) if code + step < 25 else 0
+     for code in range(25)]
+    for step in _CODE_STEP
+)
+
+
+def _gain(code, side, discs):
+    # the most the score of one segment can move in favour of side (up for
+    # PLAYER1, down for PLAYER2) when side drops up to discs more discs
+    mine, theirs = (code % 5, code // 5) if side == 0 else (code // 5, code % 5)
+    if discs == 0:
+        return 0
+    if theirs == 0:
+        return _WEIGHTS[min(4, mine + discs)] - _WEIGHTS[mine]
+    if mine == 0:
+        # a disc of side takes the segment away from the other player
+        return _WEIGHTS[theirs]
+    return 0
+
+
+# _GAINS[side][discs][code], see _gain(); more than 4 discs gain no more
+_GAINS = tuple(
+    tuple([_gain(code, side, discs) for code in range(25)] for discs in range(5))
+    for side in (0, 1)
+)
+
+
+class _Geometry:
+    """
+    Precomputed bit layout shared by every Bitboard of the same size.
+
+    Discs are stored column by column, (rows + 1) bits per column with the
+    lowest bit at the bottom of the column. The extra bit on top of each
+    column is always empty, so shifting a mask never carries a line of discs
+    over from one column into the next.
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        # number of bits reserved for each column
+        self.stride = rows + 1
+        # the bit of the lowest cell in each column
+        self.bottom = [1 << (c*self.stride) for c in range(cols)]
+        # every playable cell on the board
+        self.full = 0
+        for c in range(cols):
+            self.full |= ((1 << rows) - 1) << (c*self.stride)
+        # shift distances for the four directions a line can take:
+        # vertical, horizontal, slash and backslash
+        self.shifts = (1, self.stride, self.stride+1, self.stride-1)
+        # all 4-slot segments on the board, each stored as a mask of 4 bits
+        self.windows = []
+        for c in range(cols):
+            for r in range(rows):
+                for dr, dc in ((1, 0), (0, 1), (1, 1), (-1, 1)):
+                    end_r, end_c = r + 3*dr, c + 3*dc
+                    if 0 <= end_r < rows and end_c < cols:
+                        mask = 0
+                        for i in range(4):
+                            mask |= self.bit(r + i*dr, c + i*dc)
+                        self.windows.append(mask)
+        # the segments each cell belongs to, indexed by bit position
+        self.cell_windows = [[] for _ in range(cols*self.stride)]
+        for w, mask in enumerate(self.windows):
+            for i in range(cols*self.stride):
+                if mask >> i & 1:
+                    self.cell_windows[i].append(w)
+        # Zobrist keys: a random 64-bit key for each side and cell, xored
+        # together for every disc on the board, plus a key xored in when
+        # PLAYER2 is the one to move. The keys only depend on the board
+        # size, so hashes stay the same from one run to the next.
+        rng = random.Random("zobrist %dx%d" % (rows, cols))
+        self.zobrist = [
+            [rng.getrandbits(64) for _ in range(cols*self.stride)]
+            for _ in range(2)
+        ]
+        self.side_keys = (0, rng.getrandbits(64))
+        # columns from the center outwards, the left one first on a tie
+        self.center_first = sorted(range(cols), key=lambda c: (abs(2*c - cols + 1), c))
+
+    def bit(self, r, c):
+        # r is counted from the bottom of the column
+        return 1 << (c*self.stride + r)
+
+
+# geometries are cached per board size, so cloning a board is only a few ints
+_geometries = {}
+
+
+def _geometry(rows, cols):
+    if (rows, cols) not in _geometries:
+        _geometries[(rows, cols)] = _Geometry(rows, cols)
+    return _geometries[(rows, cols)]
+
+
+def _four_in_a_row(mask, shifts):
+    # a mask holds four in a row if, for some direction, a disc has three
+    # more discs of the same mask following it in that direction
+    for s in shifts:
+        m = mask & (mask >> s)
+        if m & (m >> (2*s)):
+            return True
+    return False
+
+
+class Bitboard:
+    """
+    A compact four-in-a-row board: one integer mask per player plus the
+    height of every column.
+
+    The search functions play and take back moves on a single Bitboard
+    (see play() and undo()), so visiting a node costs a couple of integer
+    operations instead of a board copy. The class also provides the methods
+    of the game board (placeable, place, clone, row, col, terminal), so it
+    can be passed anywhere a board instance is expected.
+    """
+
+    # number of Bitboards made so far, read by the search instrumentation
+    allocated = 0
+
+    def __init__(self, rows, cols, player1=1, player2=2, empty=0,
+                 bottom_first=False):
+        Bitboard.allocated += 1
+        self.rows = rows
+        self.cols = cols
+        self.PLAYER1 = player1
+        self.PLAYER2 = player2
+        self.EMPTY = empty
+        # whether row 0 of row()/col() is the bottom of the board
+        self.bottom_first = bottom_first
+        self.geometry = _geometry(rows, cols)
+        # masks[0] holds the discs of PLAYER1, masks[1] the discs of PLAYER2
+        self.masks = [0, 0]
+        # number of discs in each column
+        self.heights = [0]*cols
+        # (side, col) of every move played with play(), used by undo()
+        self.history = []
+        # 0 or 1 if that side has four in a row, None otherwise
+        self.winner = None
+        # code of each 4-slot segment, see _contribution()
+        self.codes = [0]*len(self.geometry.windows)
+        # evaluate() score for PLAYER1, kept up to date by play() and undo()
+        self.score = 0
+        # Zobrist hash of the discs on the board, see key()
+        self.hash = 0
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Build a Bitboard from any board instance that provides rows, cols,
+        PLAYER1, PLAYER2, placeable(), clone(), place() and row().
+        """
+        if isinstance(board, Bitboard):
+            return board.clone()
+        players = (board.PLAYER1, board.PLAYER2)
+        grid = [board.row(r) for r in range(board.rows)]
+        empty = getattr(board, "EMPTY", None)
+        if empty is None:
+            # use whatever the board keeps in a slot without a disc
+            empty = next((v for row in grid for v in row if v not in players), 0)
+        # discs fall towards the bottom of the board, find out which end of
+        # the columns that is from a column that is partly filled
+        bottom_first = None
+        for c in range(board.cols):
+            top_filled = grid[0][c] in players
+            if top_filled != (grid[-1][c] in players):
+                bottom_first = top_filled
+                break
+        if bottom_first is None:
+            # every column is empty or full, so drop a disc in an empty
+            # column of a copy of the board and see where it lands
+            bottom_first = False
+            for c in range(board.cols):
+                if board.placeable(c):
+                    probe = board.clone()
+                    probe.place(board.PLAYER1, c)
+                    bottom_first = probe.row(0)[c] != grid[0][c]
+                    break
+        bb = cls(board.rows, board.cols, players[0], players[1], empty,
+                 bottom_first)
+        for r in range(board.rows):
+            # r counted from the bottom of the board
+            rb = r if bottom_first else board.rows-1-r
+            for c, v in enumerate(grid[r]):
+                if v in players:
+                    bb.masks[players.index(v)] |= bb.geometry.bit(rb, c)
+        bb._recount()
+        return bb
+
+    def to_bytes(self):
+        """
+        Serialize the discs on the board: the number of rows and columns, the
+        orientation, then the mask of each side. The player values are not
+        kept, from_bytes() uses the defaults.
+        """
+        size = (self.cols*self.geometry.stride + 7)//8
+        return bytes((self.rows, self.cols, self.bottom_first)) + \
+            self.masks[0].to_bytes(size, "little") + \
+            self.masks[1].to_bytes(size, "little")
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Build a Bitboard from the output of to_bytes().
+        """
+        rows, cols, bottom_first = data[0], data[1], bool(data[2])
+        bb = cls(rows, cols, bottom_first=bottom_first)
+        size = (len(data) - 3)//2
+        bb.masks = [
+            int.from_bytes(data[3:3+size], "little"),
+            int.from_bytes(data[3+size:], "little"),
+        ]
+        bb._recount()
+        return bb
+
+    def _recount(self):
+        # set the heights, segment codes, score, hash and winner from the
+        # masks of a board that has no moves played on it yet
+        geometry = self.geometry
+        for side in (0, 1):
+            for cell in range(self.cols*geometry.stride):
+                if self.masks[side] >> cell & 1:
+                    self.heights[cell // geometry.stride] += 1
+                    self.hash ^= geometry.zobrist[side][cell]
+                    for w in geometry.cell_windows[cell]:
+                        self.codes[w] += _CODE_STEP[side]
+            if _four_in_a_row(self.masks[side], geometry.shifts):
+                self.winner = side
+        self.score = sum(_contribution(code) for code in self.codes)
+
+    def side(self, player):
+        # index of the mask that holds the discs of player
+        return 0 if player == self.PLAYER1 else 1
+
+    def player(self, side):
+        return self.PLAYER1 if side == 0 else self.PLAYER2
+
+    def moves(self):
+        # playable columns from left to right
+        return [c for c in range(self.cols) if self.heights[c] < self.rows]
+
+    def play(self, side, c):
+        """
+        Drop a disc of side (0 or 1) in column c.
+        """
+        cell = c*self.geometry.stride + self.heights[c]
+        self.masks[side] |= 1 << cell
+        self.heights[c] += 1
+        self.hash ^= self.geometry.zobrist[side][cell]
+        self.history.append((side, c))
+        # update the segments the new disc belongs to
+        codes, deltas, step = self.codes, _DELTAS[side], _CODE_STEP[side]
+        score = self.score
+        for w in self.geometry.cell_windows[cell]:
+            code = codes[w]
+            score += deltas[code]
+            codes[w] = code + step
+        self.score = score
+        if self.winner is None and \
+                _four_in_a_row(self.masks[side], self.geometry.shifts):
+            self.winner = side
+
+    def undo(self):
+        """
+        Take back the last move made with play().
+        """
+        side, c = self.history.pop()
+        self.heights[c] -= 1
+        cell = c*self.geometry.stride + self.heights[c]
+        self.masks[side] ^= 1 << cell
+        self.hash ^= self.geometry.zobrist[side][cell]
+        codes, deltas, step = self.codes, _DELTAS[side], _CODE_STEP[side]
+        score = self.score
+        for w in self.geometry.cell_windows[cell]:
+            code = codes[w] - step
+            score -= deltas[code]
+            codes[w] = code
+        self.score = score
+        if self.winner == side and \
+                not _four_in_a_row(self.masks[side], self.geometry.shifts):
+            self.winner = None
+
+    def child_scores(self, side, perspective):
+        """
+        Return a (col, score) pair for each playable column, where score is
+        what evaluate() gives for the player of perspective after side drops
+        a disc in col. The moves are not played.
+        """
+        score, codes, deltas = self.score, self.codes, _DELTAS[side]
+        cell_windows, stride = self.geometry.cell_windows, self.geometry.stride
+        sign = 1 if perspective == 0 else -1
+        return [
+            (c, sign*(score + sum([deltas[codes[w]] for w in cell_windows[c*stride + h]])))
+            for c, h in enumerate(self.heights) if h < self.rows
+        ]
+
+    def score_bounds(self, side, mine, theirs):
+        """
+        Return (low, high) bounds on what evaluate() gives for the player of
+        side after at most mine more discs of that player and theirs more
+        discs of the other one.
+
+        Discs of a player only ever move the score of a segment their way,
+        so each segment moves at most as far as the discs of one player alone
+        can take it.
+        """
+        codes = self.codes
+        up = _GAINS[0][min(4, mine if side == 0 else theirs)]
+        down = _GAINS[1][min(4, theirs if side == 0 else mine)]
+        high = self.score + sum([up[code] for code in codes])
+        low = self.score - sum([down[code] for code in codes])
+        return (low, high) if side == 0 else (-high, -low)
+
+    def key(self, side):
+        """
+        Hash of the position with the given side to move.
+        """
+        return self.hash ^ self.geometry.side_keys[side]
+
+    def full(self):
+        return (self.masks[0] | self.masks[1]) == self.geometry.full
+
+    def terminal(self):
+        return self.winner is not None or self.full()
+
+    def evaluate(self, side):
+        """
+        Same score as evaluate() for the player of the given side, read off
+        the score that play() and undo() keep up to date.
+        """
+        return self.score if side == 0 else -self.score
+
+    # methods of the game board ###############################################
+
+    def clone(self):
+        bb = Bitboard(self.rows, self.cols, self.PLAYER1, self.PLAYER2,
+                      self.EMPTY, self.bottom_first)
+        bb.masks = list(self.masks)
+        bb.heights = list(self.heights)
+        bb.winner = self.winner
+        bb.codes = list(self.codes)
+        bb.score = self.score
+        bb.hash = self.hash
+        return bb
+
+    def placeable(self, c):
+        return self.heights[c] < self.rows
+
+    def place(self, player, c):
+        self.play(self.side(player), c)
+
+    def _cell(self, r, c):
+        rb = r if self.bottom_first else self.rows-1-r
+        bit = self.geometry.bit(rb, c)
+        if self.masks[0] & bit:
+            return self.PLAYER1
+        if self.masks[1] & bit:
+            return self.PLAYER2
+        return self.EMPTY
+
+    def row(self, r):
+        return [self._cell(r, c) for c in range(self.cols)]
+
+    def col(self, c):
+        return [self._cell(r, c) for r in range(self.rows)]
+
+
+# bound flags of the transposition table entries
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """
+    A bounded table of search results keyed by Zobrist hash.
+
+    Every entry stores the value of a position searched to some depth, whether
+    that value is exact or only a lower or upper bound (the search was cut off
+    by alpha-beta), and the best move found. Values are always from the point
+    of view of the player to move in the position, so one table can be shared
+    by both players and across all the moves of a game.
+
+    The table has a fixed number of slots. When two positions fall in the same
+    slot, the new one replaces the old one if the old one is left over from an
+    earlier search, or if the new one was searched at least as deep.
+
+    Parameters
+    ----------
+    size: int
+        the number of slots in the table
+    """
+
+    def __init__(self, size=1 << 18):
+        self.size = size
+        self.slots = [None]*size
+        # the current search, see new_search()
+        self.generation = 0
+        # probes that found the key and that did not
+        self.hits = 0
+        self.misses = 0
+        # lookups, and how many of them returned a usable value; a hit is
+        # not usable if it was searched to another depth or its bound does
+        # not cut the window
+        self.lookups = 0
+        self.settled = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        # called at the start of every search, so that entries of earlier
+        # searches are the first ones to be replaced
+        self.generation += 1
+
+    def best_move(self, key):
+        """
+        Return the best move recorded for the position with the given key,
+        without counting it as a probe.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[4]
+        return None
+
+    def probe(self, key):
+        """
+        Return the (key, depth, flag, value, move, generation) entry of the
+        position with the given key, or None if it is not in the table.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        if entry is not None:
+            # the slot is taken by another position
+            self.collisions += 1
+        return None
+
+    def lookup(self, key, depth, alpha, beta):
+        """
+        Return the value of the position if the table settles it for a search
+        to the given depth with the window (alpha, beta), None otherwise.
+        """
+        self.lookups += 1
+        entry = self.probe(key)
+        # only use values searched to exactly the same depth, so that a warm
+        # table never changes the outcome of a fixed-depth search
+        if entry is None or entry[1] != depth:
+            return None
+        flag, value = entry[2], entry[3]
+        if flag == EXACT or \
+                (flag == LOWER and value >= beta) or \
+                (flag == UPPER and value <= alpha):
+            self.settled += 1
+            return value
+        return None
+
+    def store(self, key, depth, value, alpha, beta, move=None):
+        """
+        Record the value of a position searched to the given depth with the
+        window (alpha, beta), along with the best move found.
+        """
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is not None and entry[0] != key:
+            if entry[5] == self.generation and entry[1] > depth:
+                # keep the deeper result of the current search
+                return
+            self.replacements += 1
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.slots[index] = (key, depth, flag, value, move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        self.slots = [None]*self.size
+        self.generation = 0
+
+    def stats(self):
+        """
+        Return the counters of the table as a dict.
+        """
+        return {
+            "size": self.size,
+            "filled": self.size - self.slots.count(None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lookups": self.lookups,
+            "settled": self.settled,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "replacements": self.replacements,
+        }
+
+
+# the table shared by minimax and alphabeta unless they are given their own,
+# so it stays warm from one move of a game to the next
+transposition_table = TranspositionTable()
+
+
+class SearchTimeout(Exception):
+    """
+    Raised by a search that runs past the deadline of its SearchContext.
+    """
+
+
+class SearchContext:
+    """
+    State shared between a search function and the code driving it.
+
+    Parameters
+    ----------
+    deadline: float or None
+        time.perf_counter() time after which the search raises SearchTimeout,
+        None to search without a time limit
+    pv: dict or None
+        the principal variation of an earlier search, as a dict from position
+        key (see Bitboard.key()) to the move played there; these moves are
+        tried first
+    root_moves: collection of int or None
+        the only columns to consider at the root, None for all of them
+    alpha, beta: float
+        the window of the root of alphabeta
+    bound: callable or None
+        returns a value the root is known to reach from elsewhere (another
+        search of the other root moves), read by alphabeta as the search of
+        the root moves goes on
+    """
+
+    # how many nodes are visited between two looks at the clock
+    CLOCK_INTERVAL = 1024
+
+    def __init__(self, deadline=None, pv=None, root_moves=None,
+                 alpha=-math.inf, beta=math.inf, bound=None):
+        self.deadline = deadline
+        self.pv = pv or {}
+        self.root_moves = root_moves
+        self.alpha = alpha
+        self.beta = beta
+        self.bound = bound
+        # value of the root found by the last search
+        self.score = None
+        # number of nodes visited so far
+        self.nodes = 0
+        # killer moves of alphabeta: for each ply, the last two moves that
+        # caused a cutoff there
+        self.killers = {}
+        # history heuristic of alphabeta: how much a disc of a side in a cell
+        # (keyed by 2*cell + side) has caused cutoffs so far
+        self.history = {}
+        # number of alphabeta nodes cut off, and how many of these were cut
+        # off by the first move tried
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # number of leaves scored with evaluate()
+        self.evaluations = 0
+
+    def first_move_cutoff_rate(self):
+        # the share of cutoffs found on the first move, close to 1 when the
+        # move ordering is good
+        return self.first_move_cutoffs/self.cutoffs if self.cutoffs else 0.0
+
+    def visit(self, count=1):
+        self.nodes += count
+        if self.deadline is not None and \
+                self.nodes % self.CLOCK_INTERVAL < count and \
+                time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+
+def _principal_variation(bb, side, table, depth_limit):
+    # follow the best moves recorded in the table from the given position,
+    # returns a dict from position key to move as used by SearchContext.pv
+    pv = {}
+    played = 0
+    while played < depth_limit and not bb.terminal():
+        key = bb.key(side)
+        move = table.best_move(key)
+        if move is None or not bb.placeable(move):
+            break
+        pv[key] = move
+        bb.play(side, move)
+        played += 1
+        side = 1 - side
+    for _ in range(played):
+        bb.undo()
+    return pv
+
+
+# the move ordering heuristics of alphabeta, in the order they are applied
+ORDERINGS = ("table", "killers", "history", "center")
+
+
+def _root_moves(moves, context):
+    # the moves to consider at the root of a search
+    if context.root_moves is None:
+        return moves
+    return [c for c in moves if c in context.root_moves]
+
+
+def _tried_first(moves, move):
+    # the moves with the given one moved to the front
+    if move is not None and move in moves:
+        moves.remove(move)
+        moves.insert(0, move)
+    return moves
+
+
+# Opening book and endgame solver ##############################################
+#
+# Both answer a position before any search is run: the opening book from a
+# file of precomputed moves, the endgame solver by playing the game out to the
+# end once few empty slots are left and remembering the result.
+
+# book file layout: magic, version, rows, cols, search family, depth, number
+# of positions, then the sorted 64-bit position keys and one move per key
+_BOOK_HEADER = struct.Struct("<4sBBBBBxxxI")
+_BOOK_MAGIC = b"FIAR"
+# searches that find the same placements share a book, minimax and alphabeta
+# both find the minimax value
+_BOOK_FAMILIES = {"minimax": 0, "alphabeta": 0, "expectimax": 1}
+
+
+class OpeningBook:
+    """
+    A memory-mapped file of precomputed placements, see build_opening_book().
+
+    Parameters
+    ----------
+    path: str
+        the book file
+    """
+
+    def __init__(self, path):
+        # kept for the worker processes, which open the book themselves
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.rows, self.cols, self.family, self.depth, count = \
+            _BOOK_HEADER.unpack_from(self.data)
+        if magic != _BOOK_MAGIC:
+            raise ValueError("%s is not an opening book" % path)
+        start = _BOOK_HEADER.size
+        if sys.byteorder == "little":
+            self.keys = memoryview(self.data)[start:start + 8*count].cast("Q")
+        else:
+            self.keys = array("Q", self.data[start:start + 8*count])
+            self.keys.byteswap()
+        self.moves = memoryview(self.data)[start + 8*count:start + 9*count]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, bb, side, search_name):
+        """
+        Return the book placement for side to move on the Bitboard bb, or
+        None if the book has none for this position and search.
+        """
+        if (bb.rows, bb.cols) != (self.rows, self.cols) or \
+                _BOOK_FAMILIES[search_name] != self.family:
+            return None
+        key = bb.key(side)
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.moves[i]
+        return None
+
+
+def build_opening_book(path, search=None, depth_limit=8, plies=4, rows=6,
+                       cols=7):
+    """
+    Search every position up to the given number of plies from the empty
+    board, with either player moving first, and write the placements to a
+    book file.
+
+    Parameters
+    ----------
+    path: str
+        the book file to write
+    search: minimax, alphabeta or expectimax
+        the search finding the placements, alphabeta if None
+    depth_limit: int
+        the depth of these searches
+    plies: int
+        how many discs the positions in the book hold at most
+    rows, cols: int
+        the board size
+
+    Returns
+    -------
+    the number of positions in the book
+    """
+    search = search or alphabeta
+    book = {}
+    bb = Bitboard(rows, cols)
+
+    def add(side, plies_left):
+        key = bb.key(side)
+        if bb.terminal() or key in book:
+            return
+        book[key] = search(bb.player(side), bb, depth_limit)
+        if plies_left > 0:
+            for c in bb.moves():
+                bb.play(side, c)
+                add(1 - side, plies_left - 1)
+                bb.undo()
+
+    add(0, plies)
+    add(1, plies)
+    keys = array("Q", sorted(book))
+    moves = bytes(book[key] for key in keys)
+    if sys.byteorder != "little":
+        keys.byteswap()
+    with open(path, "wb") as file:
+        file.write(_BOOK_HEADER.pack(_BOOK_MAGIC, 1, rows, cols,
+                                     _BOOK_FAMILIES[search.__name__],
+                                     depth_limit, len(moves)))
+        file.write(keys.tobytes())
+        file.write(moves)
+    return len(moves)
+
+
+# the book consulted by the searches, see load_opening_book()
+opening_book = None
+# the endgame solver plays positions with at most this many empty slots out
+# to the end, 0 turns it off; see set_endgame_solver()
+endgame_empties = 0
+# solved positions: position key -> (flag, score) of _solve(), cleared when
+# it holds _endgame_cache_size of them
+_endgame_cache = {}
+_endgame_cache_size = 1 << 20
+# the placements found for solved positions, by position key
+_endgame_moves = {}
+
+
+def load_opening_book(path):
+    """
+    Load the book file at path for minimax, alphabeta and expectimax to
+    consult before searching, None to stop using a book. The worker pools
+    are stopped, so that their next searches start workers using it.
+    """
+    global opening_book
+    opening_book = OpeningBook(path) if path is not None else None
+    shutdown_pools()
+
+
+def set_endgame_solver(empties, cache_size=1 << 20):
+    """
+    Let minimax and alphabeta play perfectly once at most empties slots are
+    left on the board, 0 to turn the solver off. Solved positions are kept
+    for later moves and games, up to cache_size of them. The worker pools
+    are stopped, so that their next searches start workers using it.
+    """
+    global endgame_empties, _endgame_cache_size
+    endgame_empties = empties
+    _endgame_cache_size = cache_size
+    shutdown_pools()
+
+
+def _solve(bb, side, alpha, beta):
+    """
+    The game-theoretic score for side to move when both players play
+    perfectly to the end of the game: 0 for a draw, the number of empty
+    slots left after the winning disc plus one for a win, minus that for
+    a loss, so faster wins score higher.
+    """
+    empties = bb.rows*bb.cols - sum(bb.heights)
+    moves = [c for c in bb.geometry.center_first if bb.placeable(c)]
+    if not moves:
+        return 0
+    # a move that wins right away is the best there is
+    for c in moves:
+        bb.play(side, c)
+        won = bb.winner == side
+        bb.undo()
+        if won:
+            return empties
+    key = bb.key(side)
+    cached = _endgame_cache.get(key)
+    if cached is not None:
+        flag, value = cached
+        if flag == EXACT or (flag == LOWER and value >= beta) or \
+                (flag == UPPER and value <= alpha):
+            return value
+    window = (alpha, beta)
+    v = -math.inf
+    for c in moves:
+        bb.play(side, c)
+        v = max(v, -_solve(bb, 1 - side, -beta, -alpha))
+        bb.undo()
+        if v >= beta:
+            break
+        alpha = max(alpha, v)
+    if len(_endgame_cache) >= _endgame_cache_size:
+        _endgame_cache.clear()
+    flag = UPPER if v <= window[0] else LOWER if v >= window[1] else EXACT
+    _endgame_cache[key] = (flag, v)
+    return v
+
+
+def _solve_move(bb, side):
+    # the leftmost of the moves with the best perfect-play score
+    key = bb.key(side)
+    if key in _endgame_moves:
+        return _endgame_moves[key]
+    best = placement = None
+    for c in bb.moves():
+        bb.play(side, c)
+        if bb.winner == side:
+            score = bb.rows*bb.cols - sum(bb.heights) + 1
+        else:
+            score = -_solve(bb, 1 - side, -math.inf, math.inf)
+        bb.undo()
+        if best is None or score > best:
+            best, placement = score, c
+    if len(_endgame_moves) >= _endgame_cache_size:
+        _endgame_moves.clear()
+    _endgame_moves[key] = placement
+    return placement
+
+
+def _oracle_move(bb, side, search_name, context):
+    """
+    The placement of the opening book or the endgame solver for side to move,
+    None if neither has one and the position needs a search.
+    """
+    if context.root_moves is not None or bb.terminal():
+        return None
+    if opening_book is not None:
+        move = opening_book.lookup(bb, side, search_name)
+        if move is not None:
+            return move
+    if search_name != "expectimax" and \
+            bb.rows*bb.cols - sum(bb.heights) <= endgame_empties:
+        return _solve_move(bb, side)
+    return None
+
+
+# Instrumentation ##############################################################
+#
+# With a hook installed by set_instrumentation(), every call of minimax,
+# alphabeta and expectimax hands a SearchStats to the hook when it returns.
+# Without one, the searches run as they are: the counters they keep are plain
+# integers of the SearchContext, and nothing else is done.
+
+# the function called with the SearchStats of every search, None when the
+# searches are not instrumented
+_instrumentation = None
+
+
+class SearchStats:
+    """
+    What one call of a search function cost.
+
+    Attributes
+    ----------
+    search: str
+        the name of the search function
+    depth_limit: int
+        the depth the search was asked to go to
+    placement: int or None
+        the column chosen, None if the search timed out
+    timed_out: bool
+        whether the search ran past its deadline and was abandoned
+    nodes: int
+        the number of nodes visited
+    evaluations: int
+        the number of leaves scored with evaluate()
+    clones: int
+        the number of boards copied (the search copies the game board once,
+        then plays and takes back moves on the copy)
+    cutoffs, first_move_cutoffs: int
+        the number of nodes cut off by pruning, and how many of these were
+        cut off by the first move tried (alphabeta only)
+    table_hits, table_misses: int
+        lookups of the transposition table that settled a position and that
+        did not, whether the position was missing or its entry could not be
+        used (minimax and alphabeta only)
+    elapsed_ms: float
+        the wall-clock time of the search, in milliseconds
+    """
+
+    FIELDS = ("search", "depth_limit", "placement", "timed_out", "nodes",
+              "evaluations", "clones", "cutoffs", "first_move_cutoffs",
+              "table_hits", "table_misses", "elapsed_ms")
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name, 0))
+
+    def __repr__(self):
+        return "SearchStats(%s)" % ", ".join(
+            "%s=%r" % (name, getattr(self, name)) for name in self.FIELDS)
+
+    def nodes_per_second(self):
+        return self.nodes/self.elapsed_ms*1000 if self.elapsed_ms else 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def to_json(self):
+        # one line of a JSON lines file
+        return json.dumps(self.to_dict())
+
+
+class JsonLinesWriter:
+    """
+    A hook for set_instrumentation() that writes every SearchStats as a line
+    of JSON to a file.
+
+    Parameters
+    ----------
+    file: str or file object
+        the path of the file to append to, or an open text file
+    """
+
+    def __init__(self, file):
+        self.path = file if isinstance(file, str) else None
+        self.file = open(file, "a") if self.path else file
+
+    def __call__(self, stats):
+        self.file.write(stats.to_json() + "\n")
+        self.file.flush()
+
+    def close(self):
+        # only close the file if it was opened here
+        if self.path:
+            self.file.close()
+
+
+def set_instrumentation(hook):
+    """
+    Call hook with the SearchStats of every search from now on, or stop
+    instrumenting the searches if hook is None. Returns the previous hook.
+
+    The hook runs in the process that runs the search, so with
+    parallel_search() and batch_search() only the searches of this process
+    are reported.
+    """
+    global _instrumentation
+    previous = _instrumentation
+    _instrumentation = hook
+    return previous
+
+
+def _instrumented(search):
+    # wrap a search function so that it reports to the instrumentation hook
+    signature = inspect.signature(search)
+
+    @functools.wraps(search)
+    def wrapper(*args, **kwargs):
+        hook = _instrumentation
+        if hook is None:
+            return search(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        arguments = bound.arguments
+        # the counters are read off the context, so make sure there is one,
+        # whether it was left out or passed as None
+        context = arguments.get("context")
+        if context is None:
+            context = arguments["context"] = SearchContext()
+        table = None
+        if "table" in signature.parameters:
+            table = arguments.get("table") or transposition_table
+
+        def counters():
+            return (context.nodes, context.evaluations, Bitboard.allocated,
+                    context.cutoffs, context.first_move_cutoffs,
+                    table.settled if table else 0,
+                    table.lookups - table.settled if table else 0)
+
+        before = counters()
+        placement = None
+        timed_out = False
+        start = time.perf_counter()
+        try:
+            placement = search(*bound.args, **bound.kwargs)
+            return placement
+        except SearchTimeout:
+            timed_out = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start)*1000
+            counts = [a - b for a, b in zip(counters(), before)]
+            hook(SearchStats(
+                search=search.__name__, depth_limit=arguments["depth_limit"],
+                placement=placement, timed_out=timed_out, nodes=counts[0],
+                evaluations=counts[1], clones=counts[2], cutoffs=counts[3],
+                first_move_cutoffs=counts[4], table_hits=counts[5],
+                table_misses=counts[6], elapsed_ms=elapsed_ms))
+
+    return wrapper
+
 
 def get_child_boards(player, board):
     """
@@ -44,66 +1075,83 @@ def evaluate(player, board):
         a scalar to evaluate the advantage of the specific player at the given
         game board
     """
-    adversary = board.PLAYER2 if player == board.PLAYER1 else board.PLAYER1
-    # Initialize the value of scores
+    # Every 4-slot segment on the board is scored from the counts
     # [s0, s1, s2, s3, --s4--]
     # s0 for the case where all slots are empty in a 4-slot segment
     # s1 for the case where the player occupies one slot in a 4-slot line, the rest are empty
     # s2 for two slots occupied
     # s3 for three
     # s4 for four
-    score = [0]*5
-    adv_score = [0]*5
-
-    # Initialize the weights
-    # [w0, w1, w2, w3, --w4--]
+    # segments holding discs of both players count for neither of them.
+    # The counts are weighted by
+    # [w0, w1, w2, w3, --w4--] = _WEIGHTS
     # w0 for s0, w1 for s1, w2 for s2, w3 for s3
     # w4 for s4
-    weights = [0, 1, 4, 16, 1000]
-
-    # Obtain all 4-slot segments on the board
-    seg = []
-    invalid_slot = -1
-    left_revolved = [
-        [invalid_slot]*r + board.row(r) + \
-        [invalid_slot]*(board.rows-1-r) for r in range(board.rows)
-    ]
-    right_revolved = [
-        [invalid_slot]*(board.rows-1-r) + board.row(r) + \
-        [invalid_slot]*r for r in range(board.rows)
-    ]
-    for r in range(board.rows):
-        # row
-        row = board.row(r) 
-        for c in range(board.cols-3):
-            seg.append(row[c:c+4])
-    for c in range(board.cols):
-        # col
-        col = board.col(c) 
-        for r in range(board.rows-3):
-            seg.append(col[r:r+4])
-    for c in zip(*left_revolved):
-        # slash
-        for r in range(board.rows-3):
-            seg.append(c[r:r+4])
-    for c in zip(*right_revolved): 
-        # backslash
-        for r in range(board.rows-3):
-            seg.append(c[r:r+4])
-    # compute score
-    for s in seg:
-        if invalid_slot in s:
+    # and the score is the weighted counts of the player minus those of the
+    # adversary.
+    if not isinstance(board, Bitboard):
+        board = Bitboard.from_board(board)
+    return board.evaluate(board.side(player))
+
+
+def _segment_counts(discs):
+    """
+    For an (N, rows, cols) array of 0/1 values, yield an array per direction
+    holding the sum of the 4 slots of every segment in that direction.
+    """
+    _, rows, cols = discs.shape
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+        # number of segments along the rows and the columns
+        n_rows, n_cols = rows - 3*abs(dr), cols - 3*dc
+        if n_rows <= 0 or n_cols <= 0:
             continue
-        if adversary not in s:
-            score[s.count(player)] += 1
-        if player not in s:
-            adv_score[s.count(adversary)] += 1
-    reward = sum([s*w for s, w in zip(score, weights)])
-    penalty = sum([s*w for s, w in zip(adv_score, weights)])
-    return reward - penalty
+        # first row of the first slot, segments going up start further down
+        r0 = 3 if dr < 0 else 0
+        yield sum(
+            discs[:, r0 + i*dr:r0 + i*dr + n_rows, i*dc:i*dc + n_cols]
+            for i in range(4)
+        )
 
 
-def minimax(player, board, depth_limit):
+def evaluate_many(player, adversary, boards):
+    """
+    Vectorized evaluate() of many boards at once.
+
+    Parameters
+    ----------
+    player: board.PLAYER1 or board.PLAYER2
+        the specific player
+    adversary: board.PLAYER1 or board.PLAYER2
+        the other player
+    boards: array-like of shape (N, rows, cols)
+        the slots of N boards, row by row as given by board.row()
+
+    Returns
+    -------
+    scores: numpy array of N ints
+        evaluate(player, board) of each board
+    """
+    # only evaluate_many() needs numpy, which takes longer to import than
+    # the rest of the module, so it is imported on the first call
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("evaluate_many() needs numpy")
+    boards = np.asarray(boards)
+    n = len(boards)
+    mine = (boards == player).astype(np.int8)
+    theirs = (boards == adversary).astype(np.int8)
+    weights = np.array(_WEIGHTS, dtype=np.int64)
+    scores = np.zeros(n, dtype=np.int64)
+    for m, t in zip(_segment_counts(mine), _segment_counts(theirs)):
+        # segments holding discs of both players count for neither of them
+        scores += (weights[m]*(t == 0)).reshape(n, -1).sum(axis=1)
+        scores -= (weights[t]*(m == 0)).reshape(n, -1).sum(axis=1)
+    return scores
+
+
+@_instrumented
+def minimax(player, board, depth_limit, table=None, context=None):
     """
     Minimax algorithm with limited search depth.
 
@@ -114,6 +1162,13 @@ def minimax(player, board, depth_limit):
     board: the current game board instance
     depth_limit: int
         the tree depth that the search algorithm needs to go further before stopping
+    table: TranspositionTable or None
+        the table caching the values of searched positions, the shared
+        transposition_table if None
+    context: SearchContext or None
+        counts the nodes visited, holds the deadline of the search and the
+        principal variation to try first; on return its pv is the principal
+        variation found
     max_player: boolean
 
     Returns
@@ -123,66 +1178,140 @@ def minimax(player, board, depth_limit):
         (counted from the most left as 0)
         None to give up the game
     """
+    # search on a bitboard copy of the board, playing and taking back moves
+    # on it instead of cloning a board for every child
+    bb = Bitboard.from_board(board)
     # record the player which call the minimax function as max player
-    max_player = player
+    max_player = bb.side(player)
     # record the player which is the adversary as next player
-    next_player = board.PLAYER2 if player == board.PLAYER1 else board.PLAYER1
+    next_player = 1 - max_player
     # initialize the action taken to be none
     placement = None
     # record the initial depth limit
     init_depth = depth_limit
+    # positions reached again through another move order are looked up in
+    # the transposition table instead of being searched again
+    if table is None:
+        table = transposition_table
+    table.new_search()
+    if context is None:
+        context = SearchContext()
+    pv = context.pv
+
+    # positions in the opening book or close to the end of the game are
+    # answered without a search
+    move = _oracle_move(bb, max_player, "minimax", context)
+    if move is not None:
+        context.pv = {bb.key(max_player): move}
+        return move
 
 ### Please finish the code below ##############################################
 ###############################################################################
-    def value(player, board, depth_limit):
-        if depth_limit == 0 or board.terminal():
+    def value(player, depth_limit):
+        context.visit()
+        if depth_limit == 0 or bb.terminal():
             # if the depth limit is reached or the board is in terminal state,
             # return the evaluated utility
-            return evaluate(max_player, board)
+            context.evaluations += 1
+            return bb.evaluate(max_player)
         if player == max_player:
             # if player is max player, run max_value
-            return max_value(max_player,board,depth_limit-1)
+            return max_value(max_player, depth_limit-1)
         else:
             # if player is min player, run min_value
-            return min_value(next_player,board,depth_limit-1)        
+            return min_value(next_player, depth_limit-1)
 
-    def max_value(player, board, depth_limit):
+    def max_value(player, depth_limit):
+        nonlocal placement
+        key = bb.key(player)
+        # having a depth of initial depth - 1 means that
+        # it is the very first call of recursion, which means
+        # it is the root node of game tree
+        root = depth_limit == init_depth - 1
+        # use the cached value if this position has been searched before,
+        # except at the root where we need the action as well
+        if not root:
+            cached = table.lookup(key, depth_limit, -math.inf, math.inf)
+            if cached is not None:
+                return cached
+            if depth_limit == 0:
+                # all the successor boards are leaves, score them in one go
+                scores = bb.child_scores(player, max_player)
+                context.visit(len(scores))
+                context.evaluations += len(scores)
+                best, v = max(scores, key=lambda score: score[1])
+                table.store(key, depth_limit, v, -math.inf, math.inf, best)
+                return v
         # initialize max value as -inf
         v = -math.inf
+        best = None
         # for each successor board of current board
-        for child in get_child_boards(player, board):
+        moves = bb.moves()
+        if root:
+            moves = _root_moves(moves, context)
+        # moves of the principal variation go first
+        for c in _tried_first(moves, pv.get(key)):
             # get the value of the board, which is the min of its child
-            node = value(next_player, child[1], depth_limit)
+            bb.play(player, c)
+            node = value(next_player, depth_limit)
+            bb.undo()
             if node > v:
                 # if a node is greater than current max value, replace it
                 v = node
-                nonlocal init_depth
-                # having a depth of initial depth - 1 means that
-                # it is the very first call of recursion, which means
-                # it is the root node of game tree, so we record the action 
-                # which leads to the best value when we are on the root.
-                if depth_limit == init_depth - 1:
-                    nonlocal placement
-                    placement = child[0]
+                best = c
+                # we record the action which leads to the best value when we
+                # are on the root.
+                if root:
+                    placement = c
+            elif node == v and root and c < placement:
+                # on a tie keep the leftmost column, whatever order the
+                # columns are tried in
+                best = placement = c
+        table.store(key, depth_limit, v, -math.inf, math.inf, best)
         return v
     
-    def min_value(player, board, depth_limit):
+    def min_value(player, depth_limit):
+        key = bb.key(player)
+        # the table keeps values for the player to move, which is the min
+        # player here, so values are negated on the way in and out
+        cached = table.lookup(key, depth_limit, -math.inf, math.inf)
+        if cached is not None:
+            return -cached
+        if depth_limit == 0:
+            # all the successor boards are leaves, score them in one go
+            scores = bb.child_scores(player, max_player)
+            context.visit(len(scores))
+            context.evaluations += len(scores)
+            best, v = min(scores, key=lambda score: score[1])
+            table.store(key, depth_limit, -v, -math.inf, math.inf, best)
+            return v
         # initialize min value as inf
         v = math.inf
+        best = None
         # for each successor board of current board
-        for child in get_child_boards(player, board):
+        for c in _tried_first(bb.moves(), pv.get(key)):
             # get the minimum of maxs of its child
-            v = min(v, value(max_player, child[1], depth_limit))
+            bb.play(player, c)
+            node = value(max_player, depth_limit)
+            bb.undo()
+            if node < v:
+                v = node
+                best = c
+        table.store(key, depth_limit, -v, -math.inf, math.inf, best)
         return v
    
     # run the minimax tree as "player" being the maximizer
-    score = value(player, board, depth_limit)
+    score = value(max_player, depth_limit)
+    context.score = score
+    context.pv = _principal_variation(bb, max_player, table, init_depth)
 
 ###############################################################################
     return placement
 
 
-def alphabeta(player, board, depth_limit):
+@_instrumented
+def alphabeta(player, board, depth_limit, table=None, context=None,
+              ordering=ORDERINGS):
     """
     Minimax algorithm with alpha-beta pruning.
 
@@ -193,6 +1322,21 @@ def alphabeta(player, board, depth_limit):
     board: the current game board instance
     depth_limit: int
         the tree depth that the search algorithm needs to go further before stopping
+    table: TranspositionTable or None
+        the table caching the values and bounds of searched positions, the
+        shared transposition_table if None
+    context: SearchContext or None
+        counts the nodes visited, holds the deadline of the search and the
+        principal variation to try first; on return its pv is the principal
+        variation found. It also keeps the killer moves, the history table
+        and the cutoff counters, which carry over to later searches given
+        the same context.
+    ordering: a collection of names from ORDERINGS
+        the heuristics used to order the moves at each node: the best move
+        recorded in the table, then the killer moves of the ply, then the
+        remaining moves by history score and then from the center outwards.
+        Without "center" moves start out from left to right. The principal
+        variation of the context always goes first.
     alpha: float
     beta: float
     max_player: boolean
@@ -205,84 +1349,199 @@ def alphabeta(player, board, depth_limit):
         (counted from the most left as 0)
         None to give up the game
     """
+    # search on a bitboard copy of the board, playing and taking back moves
+    # on it instead of cloning a board for every child
+    bb = Bitboard.from_board(board)
     # record the player which call the minimax function as max player
-    max_player = player
+    max_player = bb.side(player)
     # record the player which is the adversary as next player
-    next_player = board.PLAYER2 if player == board.PLAYER1 else board.PLAYER1
+    next_player = 1 - max_player
     # initialize the action taken to be none
     placement = None
     # record the initial depth limit
     init_depth = depth_limit
+    # positions reached again through another move order are looked up in
+    # the transposition table instead of being searched again
+    if table is None:
+        table = transposition_table
+    table.new_search()
+    if context is None:
+        context = SearchContext()
+    pv = context.pv
+
+    # positions in the opening book or close to the end of the game are
+    # answered without a search
+    move = _oracle_move(bb, max_player, "alphabeta", context)
+    if move is not None:
+        context.pv = {bb.key(max_player): move}
+        return move
+    for name in ordering:
+        if name not in ORDERINGS:
+            raise ValueError("unknown move ordering: %s" % name)
+    killers, history = context.killers, context.history
+    stride = bb.geometry.stride
+    columns = bb.geometry.center_first if "center" in ordering else range(bb.cols)
+
+    def order(player, key, depth_limit):
+        """
+        The moves playable by player in the position with the given key,
+        in the order they should be tried.
+        """
+        moves = [c for c in columns if bb.heights[c] < bb.rows]
+        if "history" in ordering:
+            # stable sort, so the static order decides among equal scores
+            moves.sort(key=lambda c: -history.get(2*(c*stride + bb.heights[c]) + player, 0))
+        first = [pv.get(key)]
+        if "table" in ordering:
+            first.append(table.best_move(key))
+        if "killers" in ordering:
+            first.extend(killers.get(init_depth - depth_limit, ()))
+        for c in reversed(first):
+            _tried_first(moves, c)
+        return moves
+
+    def cutoff(player, depth_limit, c, i):
+        """
+        Record that move c, the i-th move tried, cut off the search.
+        """
+        context.cutoffs += 1
+        if i == 0:
+            context.first_move_cutoffs += 1
+        ply = init_depth - depth_limit
+        ply_killers = killers.setdefault(ply, [])
+        if c not in ply_killers:
+            ply_killers.insert(0, c)
+            del ply_killers[2:]
+        cell = 2*(c*stride + bb.heights[c]) + player
+        history[cell] = history.get(cell, 0) + (depth_limit + 1)**2
 
 ### Please finish the code below ##############################################
 ###############################################################################
     # initialize max's best option on path to root as -inf
-    alpha = -math.inf
+    alpha = context.alpha
     # initialize min's best option on path to root as inf
-    beta = math.inf
+    beta = context.beta
+    # a value the root is known to reach from a search elsewhere
+    bound = context.bound
 
-    def value(player, board, depth_limit, alpha, beta):
-        if depth_limit == 0 or board.terminal():
+    def value(player, depth_limit, alpha, beta):
+        context.visit()
+        if depth_limit == 0 or bb.terminal():
             # if the depth limit is reached or the board is in terminal state,
             # return the evaluated utility
-            return evaluate(max_player, board)
+            context.evaluations += 1
+            return bb.evaluate(max_player)
         if player == max_player:
             # if player is max player, run max_value
-            return max_value(max_player,board,depth_limit-1, alpha, beta)
+            return max_value(max_player, depth_limit-1, alpha, beta)
         else:
             # if player is min player, run min_value
-            return min_value(next_player,board,depth_limit-1, alpha, beta)
+            return min_value(next_player, depth_limit-1, alpha, beta)
 
-    def max_value(player, board, depth_limit, alpha, beta):
+    def max_value(player, depth_limit, alpha, beta):
+        nonlocal placement
+        key = bb.key(player)
+        # having a depth of initial depth - 1 means that
+        # it is the very first call of recursion, which means
+        # it is the root node of game tree
+        root = depth_limit == init_depth - 1
+        # use the cached value if this position has been searched before and
+        # the result settles it for the current window, except at the root
+        # where we need the action as well
+        if not root:
+            cached = table.lookup(key, depth_limit, alpha, beta)
+            if cached is not None:
+                return cached
+        # the window the value is computed for, to tell in the table whether
+        # it is exact or only a bound
+        window = (alpha, beta)
         # initialize max value as -inf
         v = -math.inf
+        best = None
         # for each successor board of current board
-        for child in get_child_boards(player, board):
-            # get the value of the board, which is the min of its child
-            node = value(next_player, child[1], depth_limit, alpha, beta)
+        moves = order(player, key, depth_limit)
+        if root:
+            moves = _root_moves(moves, context)
+        # try the moves most likely to cause a cutoff first
+        for i, c in enumerate(moves):
+            # get the value of the board, which is the min of its child;
+            # at the root the window is one wider, so that a column as good
+            # as the best one so far gets its exact value instead of a bound
+            # (scores are integers) and ties can be broken by column
+            bb.play(player, c)
+            node = value(next_player, depth_limit, alpha - 1 if root else alpha, beta)
+            bb.undo()
             if node > v:
                 # if a node is greater than current max value, replace it
                 v = node
-                nonlocal init_depth
-                # having a depth of initial depth - 1 means that
-                # it is the very first call of recursion, which means
-                # it is the root node of game tree, so we record the action 
-                # which leads to the best value when we are on the root.
-                if depth_limit == init_depth - 1:
-                    nonlocal placement
-                    placement = child[0]
+                best = c
+                # we record the action which leads to the best value when we
+                # are on the root.
+                if root:
+                    placement = c
+            elif node == v and root and c < placement:
+                # on a tie keep the leftmost column, whatever order the
+                # columns are tried in
+                best = placement = c
             # if current max value of this node already greater than current min value of minimizer above it, 
             # then that minimizer will definitely not choose this branch,
             # because the max value will never go down. Therefore, just return current max value and skip the rest
             if v >= beta:
-                return v
+                cutoff(player, depth_limit, c, i)
+                break
             # keep updating max's best option 
             alpha = max(alpha, v)
+        table.store(key, depth_limit, v, window[0], window[1], best)
         return v
     
-    def min_value(player, board, depth_limit, alpha, beta):
+    def min_value(player, depth_limit, alpha, beta):
+        key = bb.key(player)
+        # the table keeps values for the player to move, which is the min
+        # player here, so values and windows are negated on the way in and out
+        cached = table.lookup(key, depth_limit, -beta, -alpha)
+        if cached is not None:
+            return -cached
+        window = (alpha, beta)
         # initialize min value as inf
         v = math.inf
-        # for each successor board of current board
-        for child in get_child_boards(player, board):
+        best = None
+        # for each successor board of current board, the moves most likely
+        # to cause a cutoff first
+        for i, c in enumerate(order(player, key, depth_limit)):
             # get the minimum of maxs of its child
-            v = min(v, value(max_player, child[1], depth_limit, alpha, beta))
+            bb.play(player, c)
+            node = value(max_player, depth_limit, alpha, beta)
+            bb.undo()
+            if node < v:
+                v = node
+                best = c
+            if bound is not None and depth_limit == init_depth - 2:
+                # on a move right below the root, another search may have
+                # found a root move at least as good by now; one less than
+                # its value, to keep ties apart as the root does
+                alpha = max(alpha, bound() - 1)
+                window = (max(window[0], alpha), window[1])
             # if current min value of this node already samller than current max value of maximizer above it, 
             # then that maximizer will definitely not choose this branch,
             # because the min value will never go up. Therefore, just return current min value and skip the rest
             if v<= alpha:
-                return v
+                cutoff(player, depth_limit, c, i)
+                break
             # keep updating min's best option 
             beta = min(beta, v)
+        table.store(key, depth_limit, -v, -window[1], -window[0], best)
         return v
 
     # run the minimax tree with alphabeta pruning as "player" being the maximizer
-    score = value(player, board, depth_limit, alpha, beta)
+    score = value(max_player, depth_limit, alpha, beta)
+    context.score = score
+    context.pv = _principal_variation(bb, max_player, table, init_depth)
 ###############################################################################
     return placement
 
 
-def expectimax(player, board, depth_limit):
+@_instrumented
+def expectimax(player, board, depth_limit, context=None, pruning=None):
     """
     Expectimax algorithm.
     We assume that the adversary of the initial player chooses actions
@@ -298,6 +1557,16 @@ def expectimax(player, board, depth_limit):
     board: the current game board instance
     depth_limit: int
         the tree depth that the search algorithm needs to go before stopping
+    context: SearchContext or None
+        counts the nodes visited, holds the deadline of the search and the
+        principal variation to try first; on return its pv holds the
+        placement
+    pruning: None, "star1" or "star2"
+        prune chance nodes with Star1, or Star2 which first probes one move
+        of each successor and does not search it again (above the last two
+        plies, Star1 below); both rely on bounds on the values evaluate() can
+        reach within the remaining depth. The placement is the same as
+        without pruning, except that ties go to the column tried first.
     max_player: boolean
 
     Returns
@@ -307,65 +1576,516 @@ def expectimax(player, board, depth_limit):
         (counted from the most left as 0)
         None to give up the game
     """
+    # search on a bitboard copy of the board, playing and taking back moves
+    # on it instead of cloning a board for every child
+    bb = Bitboard.from_board(board)
     # record the player which call the minimax function as max player
-    max_player = player
+    max_player = bb.side(player)
     # record the player which is the adversary as next player
-    next_player = board.PLAYER2 if player == board.PLAYER1 else board.PLAYER1
+    next_player = 1 - max_player
     # initialize the action taken to be none
     placement = None
     # record the initial depth limit
     init_depth = depth_limit
+    if context is None:
+        context = SearchContext()
+    pv = context.pv
+
+    # positions in the opening book or close to the end of the game are
+    # answered without a search
+    move = _oracle_move(bb, max_player, "expectimax", context)
+    if move is not None:
+        context.pv = {bb.key(max_player): move}
+        return move
+    if pruning not in (None, "star1", "star2"):
+        raise ValueError("unknown pruning: %s" % pruning)
 
 ### Please finish the code below ##############################################
 ###############################################################################
-    def value(player, board, depth_limit):
-        if depth_limit == 0 or board.terminal():
+    # the window of the root, only narrowed when chance nodes are pruned
+    alpha = -math.inf
+    beta = math.inf
+
+    def value(player, depth_limit, alpha, beta, probed=None):
+        context.visit()
+        if depth_limit == 0 or bb.terminal():
             # if the depth limit is reached or the board is in terminal state,
             # return the evaluated utility
-            return evaluate(max_player, board)
+            context.evaluations += 1
+            return bb.evaluate(max_player)
         if player == max_player:
             # if player is max player, run max_value
-            return max_value(max_player,board,depth_limit-1)
+            return max_value(max_player, depth_limit-1, alpha, beta, probed)
         else:
             # if player is random player, run min_value(as exp_value)
-            return min_value(next_player,board,depth_limit-1)
+            return min_value(next_player, depth_limit-1, alpha, beta)
 
-    def max_value(player, board, depth_limit):
+    def max_value(player, depth_limit, alpha, beta, probed=None):
+        # probed: the (move, value) of a move Star2 has already searched,
+        # which is not searched again
+        nonlocal placement
+        # having a depth of initial depth - 1 means that
+        # it is the very first call of recursion, which means
+        # it is the root node of game tree
+        root = depth_limit == init_depth - 1
+        if depth_limit == 0 and not root:
+            # all the successor boards are leaves, score them in one go
+            scores = bb.child_scores(player, max_player)
+            context.visit(len(scores))
+            context.evaluations += len(scores)
+            return max(score for _, score in scores)
         # initialize max value as -inf
         v = -math.inf
+        moves = bb.moves()
+        if root:
+            moves = _root_moves(moves, context)
+        if pv:
+            # moves of the principal variation go first
+            moves = _tried_first(moves, pv.get(bb.key(player)))
+        if probed is not None:
+            move, v = probed
+            moves = [c for c in moves if c != move]
+            if v >= beta:
+                context.cutoffs += 1
+                return v
+            alpha = max(alpha, v)
         # for each successor board of current board
-        for child in get_child_boards(player, board):
+        for c in moves:
             # get the value of the board, which is the min of its child
-            node = value(next_player, child[1], depth_limit)
+            bb.play(player, c)
+            node = value(next_player, depth_limit, alpha, beta)
+            bb.undo()
             if node > v:
                 # if a node is greater than current max value, replace it
                 v = node
-                nonlocal init_depth
-                # having a depth of initial depth - 1 means that
-                # it is the very first call of recursion, which means
-                # it is the root node of game tree, so we record the action 
-                # which leads to the best value when we are on the root.
-                if depth_limit == init_depth - 1:
-                    nonlocal placement
-                    placement = child[0]
+                # we record the action which leads to the best value when we
+                # are on the root.
+                if root:
+                    placement = c
+            elif node == v and root and c < placement and not pruning:
+                # on a tie keep the leftmost column, whatever order the
+                # columns are tried in (with pruning, a later column may only
+                # have been shown to be no better, so the first one tried wins)
+                placement = c
+            # with pruning the chance node above only cares about values
+            # inside its window, same as alphabeta
+            if v >= beta:
+                context.cutoffs += 1
+                break
+            alpha = max(alpha, v)
         return v
     
-    def min_value(player, board, depth_limit):
+    def min_value(player, depth_limit, alpha, beta):
         # initialize expected value as 0
         v = 0
-        # for each successor board of current board
-        for child in get_child_boards(player, board):
-            # here we assume uniformly random, so we just devide the sum of all board value by number of boards
-            v = v + value(max_player, child[1], depth_limit)
-            v = v/len(get_child_boards(player, board))
-        return v
+        # the successor boards are generated once, their number is the
+        # denominator of the expectation
+        moves = bb.moves()
+        n = len(moves)
+        if depth_limit == 0:
+            # all the successor boards are leaves, score them in one go
+            scores = bb.child_scores(player, max_player)
+            context.visit(len(scores))
+            context.evaluations += len(scores)
+            for _, score in scores:
+                v = v + score
+            return v/n
+        if not pruning:
+            # here we assume uniformly random, so the value is the sum of all
+            # board values divided by the number of boards
+            for c in moves:
+                bb.play(player, c)
+                v = v + value(max_player, depth_limit, -math.inf, math.inf)
+                bb.undo()
+            return v/n
+        # Star1: every successor value lies within [low, high], so once the
+        # boards searched so far put the expectation outside of (alpha, beta)
+        # whatever the rest turn out to be, the rest can be skipped. The
+        # successors' leaves are depth_limit + 1 plies away, the random
+        # player moving first.
+        low, high = bb.score_bounds(max_player, (depth_limit + 1)//2,
+                                    (depth_limit + 2)//2)
+        lower = [low]*n
+        # the move Star2 probed in each successor with its value, and the
+        # value of the successors that end the game
+        probes = [None]*n
+        settled = [None]*n
+        if pruning == "star2" and depth_limit > 1:
+            # Star2: probe each successor by searching only its first move,
+            # which gives a lower bound on its value, and stop right away if
+            # these bounds are enough to reach beta. The probed moves are not
+            # searched again below. Just above the leaves the successors score
+            # all their moves in one go, which costs less than probing them,
+            # so Star1 is used there.
+            for i, c in enumerate(moves):
+                bb.play(player, c)
+                if bb.terminal():
+                    context.evaluations += 1
+                    lower[i] = settled[i] = bb.evaluate(max_player)
+                else:
+                    probe = bb.geometry.center_first
+                    first = next(m for m in probe if bb.placeable(m))
+                    bb.play(max_player, first)
+                    lower[i] = max(low, value(next_player, depth_limit-1, low, high))
+                    probes[i] = (first, lower[i])
+                    bb.undo()
+                bb.undo()
+            if sum(lower) >= n*beta:
+                context.cutoffs += 1
+                return sum(lower)/n
+        # sum of the lower bounds of the boards not searched yet
+        rest_low = sum(lower)
+        for i, c in enumerate(moves):
+            rest_low -= lower[i]
+            rest = n - 1 - i
+            # the values of this board that keep the expectation inside
+            # (alpha, beta), given the boards searched so far and the bounds
+            # of the ones left
+            child_alpha = n*alpha - v - rest*high
+            child_beta = n*beta - v - rest_low
+            if settled[i] is not None:
+                node = settled[i]
+            else:
+                bb.play(player, c)
+                node = value(max_player, depth_limit, max(child_alpha, low),
+                             min(child_beta, high), probes[i])
+                bb.undo()
+            v = v + node
+            if node <= child_alpha:
+                # the expectation can be at most alpha
+                context.cutoffs += 1
+                return (v + rest*high)/n
+            if node >= child_beta:
+                # the expectation is at least beta
+                context.cutoffs += 1
+                return (v + rest_low)/n
+        return v/n
 
-    # run the minimax tree with alphabeta pruning as "player" being the maximizer
-    score = value(player, board, depth_limit)
+    # run the expectimax tree as "player" being the maximizer
+    score = value(max_player, depth_limit, alpha, beta)
+    context.score = score
+    # chance nodes have no principal move, so the variation stops at the root
+    context.pv = {bb.key(max_player): placement} if placement is not None else {}
 ###############################################################################
     return placement
 
 
+# what iterative_deepening() reports: the placement found by the deepest
+# search that completed, that depth, the nodes visited by all the searches
+# and the time they took
+SearchReport = namedtuple("SearchReport", ["placement", "depth", "nodes", "elapsed_ms"])
+
+
+def iterative_deepening(player, board, time_budget_ms, search=alphabeta,
+                        max_depth=None):
+    """
+    Search to depth 1, 2, 3, ... until the time budget runs out.
+
+    Each search tries the principal variation of the previous one first, and
+    with minimax and alphabeta it also finds the transposition table warm from
+    it, so the shallow searches cost little compared with the deepest one.
+    The search that runs out of time is abandoned, except for the depth 1
+    search which always completes so that there is a placement to return.
+
+    Parameters
+    ----------
+    player: board.PLAYER1 or board.PLAYER2
+        the player that needs to take an action (place a disc in the game)
+    board: the current game board instance
+    time_budget_ms: float
+        the wall-clock time the search may take, in milliseconds
+    search: minimax, alphabeta or expectimax
+        the search to run at each depth
+    max_depth: int or None
+        the deepest search to run, by default the number of empty slots
+
+    Returns
+    -------
+    report: SearchReport
+        the placement found by the deepest completed search, with that depth,
+        the number of nodes visited and the time taken
+    """
+    start = time.perf_counter()
+    bb = Bitboard.from_board(board)
+    if max_depth is None:
+        # there is nothing more to find by searching past the end of the game
+        max_depth = bb.rows*bb.cols - sum(bb.heights)
+    context = SearchContext()
+    placement = None
+    depth = 0
+    while depth < max_depth:
+        if depth > 0:
+            context.deadline = start + time_budget_ms/1000
+        try:
+            placement = search(player, bb, depth + 1, context=context)
+        except SearchTimeout:
+            break
+        depth += 1
+        if time.perf_counter() > start + time_budget_ms/1000:
+            break
+    elapsed_ms = (time.perf_counter() - start)*1000
+    return SearchReport(placement, depth, context.nodes, elapsed_ms)
+
+
+# Parallel search ##############################################################
+#
+# The root moves are split over a pool of worker processes. Boards travel as
+# Bitboard.to_bytes(), and the best root value found so far is published in a
+# shared array, one slot per running search, which the workers read as they go.
+# The workers are started with the opening book and endgame solver settings of
+# the time (whatever the start method of the processes), so load_opening_book()
+# and set_endgame_solver() stop the pools for new ones to be started.
+
+# number of parallel searches that can run at the same time
+_BOUND_SLOTS = 64
+
+# worker pools by number of workers, and the shared bounds they were set up with
+_pools = {}
+_next_slot = 0
+# the shared bounds, in a worker process
+_worker_bounds = None
+
+
+def _init_worker(bounds, book_path, empties, cache_size):
+    global _worker_bounds, opening_book, endgame_empties, _endgame_cache_size
+    _worker_bounds = bounds
+    opening_book = OpeningBook(book_path) if book_path is not None else None
+    endgame_empties = empties
+    _endgame_cache_size = cache_size
+
+
+def _search_root_move(data, side, depth_limit, c, search_name, alpha, slot):
+    # search a single root move in a worker, return its value from the point
+    # of view of the root player and the number of nodes visited
+    bb = Bitboard.from_bytes(data)
+    context = SearchContext(root_moves=(c,), alpha=alpha,
+                            bound=lambda: _worker_bounds[slot])
+    _SEARCHES[search_name](bb.player(side), bb, depth_limit, context=context)
+    return c, context.score, context.nodes
+
+
+def _pool(workers):
+    if workers not in _pools:
+        bounds = multiprocessing.Array("d", _BOUND_SLOTS)
+        book_path = opening_book.path if opening_book is not None else None
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(bounds, book_path, endgame_empties,
+                                             _endgame_cache_size))
+        _pools[workers] = (pool, bounds)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    """
+    Stop the worker processes started by parallel_search().
+    """
+    for pool, _ in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def parallel_search(player, board, depth_limit, search=alphabeta, workers=None,
+                    context=None):
+    """
+    Search the root moves in parallel on a pool of worker processes.
+
+    For alphabeta the first root move in center-first order is searched on its
+    own to get a bound for the others (young brothers wait). The other moves
+    then go to the workers, and every result that beats the bound raises it
+    for the searches still running. Root ties are broken by column as in the
+    serial search, so the placement is the same as that of search().
+
+    Parameters
+    ----------
+    player: board.PLAYER1 or board.PLAYER2
+        the player that needs to take an action (place a disc in the game)
+    board: the current game board instance
+    depth_limit: int
+        the tree depth that the search algorithm needs to go further before stopping
+    search: minimax, alphabeta or expectimax
+        the search to run on each root move
+    workers: int or None
+        the number of worker processes, by default the number of CPUs
+    context: SearchContext or None
+        adds up the nodes visited by all the searches
+
+    Returns
+    -------
+    placement: int or None
+        the column in which a disc should be placed for the specific player
+        (counted from the most left as 0)
+        None to give up the game
+    """
+    global _next_slot
+    bb = Bitboard.from_board(board)
+    side = bb.side(player)
+    if context is None:
+        context = SearchContext()
+    moves = [c for c in bb.geometry.center_first if bb.placeable(c)]
+    if depth_limit == 0 or bb.terminal() or len(moves) < 2:
+        return search(player, bb, depth_limit, context=context)
+    # the workers only search single root moves, which skips the opening
+    # book and endgame solver, so they are consulted here as search() would
+    move = _oracle_move(bb, side, search.__name__, context)
+    if move is not None:
+        return move
+    pool, bounds = _pool(workers or multiprocessing.cpu_count())
+    slot = _next_slot
+    _next_slot = (_next_slot + 1) % _BOUND_SLOTS
+    best = placement = None
+
+    def record(c, score):
+        nonlocal best, placement
+        if best is None or score > best or (score == best and c < placement):
+            best, placement = score, c
+            bounds[slot] = best
+
+    pending = moves
+    if search is alphabeta:
+        # the eldest brother is searched first, here, for the others to have
+        # a bound to start from
+        eldest = SearchContext(root_moves=(moves[0],))
+        search(player, bb, depth_limit, context=eldest)
+        context.nodes += eldest.nodes
+        record(moves[0], eldest.score)
+        pending = moves[1:]
+    else:
+        bounds[slot] = -math.inf
+    data = bb.to_bytes()
+    name = search.__name__
+    futures = {
+        pool.submit(_search_root_move, data, side, depth_limit, c, name,
+                    -math.inf if best is None else best, slot)
+        for c in pending
+    }
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            c, score, nodes = future.result()
+            context.nodes += nodes
+            record(c, score)
+    context.score = best
+    return placement
+
+
+def parallel_speedup(player, board, depth_limit, search=alphabeta,
+                     worker_counts=(1, 2, 4)):
+    """
+    Time the serial search and parallel_search() with each number of workers.
+
+    Every run starts from an empty transposition table in every process, and
+    all of them must agree on the placement.
+
+    Returns
+    -------
+    a dict from number of workers (0 for the serial search) to a dict with the
+    "seconds" the search took, the "nodes" it visited and its "speedup" over
+    the serial search
+    """
+    results = {}
+    context = SearchContext()
+    transposition_table.clear()
+    start = time.perf_counter()
+    placement = search(player, board, depth_limit, context=context)
+    serial = time.perf_counter() - start
+    results[0] = {"seconds": serial, "nodes": context.nodes, "speedup": 1.0}
+    for workers in worker_counts:
+        shutdown_pools()
+        transposition_table.clear()
+        # start the workers before the clock does
+        _pool(workers)[0].submit(int).result()
+        context = SearchContext()
+        start = time.perf_counter()
+        found = parallel_search(player, board, depth_limit, search, workers,
+                                context)
+        seconds = time.perf_counter() - start
+        if found != placement:
+            raise RuntimeError("parallel search with %d workers placed %s "
+                               "instead of %s" % (workers, found, placement))
+        results[workers] = {"seconds": seconds, "nodes": context.nodes,
+                            "speedup": serial/seconds}
+    shutdown_pools()
+    return results
+
+
+def _search_position(data, side, depth_limit, search_name):
+    # search a whole position in a worker, return the placement
+    bb = Bitboard.from_bytes(data)
+    return _SEARCHES[search_name](bb.player(side), bb, depth_limit)
+
+
+def batch_search(positions, search=alphabeta, workers=None, max_pending=None):
+    """
+    Find a placement for each of many positions, such as the positions of many
+    games played at the same time.
+
+    Identical positions are only searched once. With more than one worker the
+    positions are searched by a pool of worker processes, each keeping its own
+    transposition table warm from one position to the next; otherwise they are
+    searched here, one after the other, sharing transposition_table.
+
+    Parameters
+    ----------
+    positions: list of (player, board, depth_limit) tuples
+        the arguments a single search would take
+    search: minimax, alphabeta or expectimax
+        the search to run on each position
+    workers: int or None
+        the number of worker processes, by default the number of CPUs
+    max_pending: int or None
+        the most positions handed to the workers at a time, by default twice
+        the number of workers
+
+    Returns
+    -------
+    placements: list of int or None
+        the placement search() returns for each position, in the same order
+    """
+    workers = workers or multiprocessing.cpu_count()
+    # the positions to search, keyed by everything the placement depends on
+    tasks = {}
+    keys = []
+    for player, board, depth_limit in positions:
+        bb = Bitboard.from_board(board)
+        key = (bb.to_bytes(), bb.side(player), depth_limit)
+        tasks.setdefault(key, bb)
+        keys.append(key)
+    results = {}
+    if workers <= 1:
+        for key, bb in tasks.items():
+            results[key] = search(bb.player(key[1]), bb, key[2])
+        return [results[key] for key in keys]
+    pool = _pool(workers)[0]
+    if max_pending is None:
+        max_pending = 2*workers
+    queue = iter(tasks)
+    pending = {}
+    while True:
+        # keep the workers fed without queueing every position at once
+        while len(pending) < max_pending:
+            key = next(queue, None)
+            if key is None:
+                break
+            future = pool.submit(_search_position, key[0], key[1], key[2],
+                                 search.__name__)
+            pending[future] = key
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[pending.pop(future)] = future.result()
+    return [results[key] for key in keys]
+
+
+# the searches parallel_search() and batch_search() can run in the workers,
+# by name
+_SEARCHES = {
+    "minimax": minimax,
+    "alphabeta": alphabeta,
+    "expectimax": expectimax,
+}
+
+
 if __name__ == "__main__":
     from game_gui import GUI
     import tkinter
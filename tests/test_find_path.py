@@ -0,0 +1,149 @@
+import io
+import os
+import random
+import subprocess
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import find_path
+
+
+def write_grid(path, size, seed):
+    rng = random.Random(seed)
+    lines = []
+    for x in range(size):
+        for y in range(size):
+            if x + 1 < size:
+                lines.append("G%d_%d G%d_%d %d" % (x, y, x + 1, y, rng.randint(1, 20)))
+            if y + 1 < size:
+                lines.append("G%d_%d G%d_%d %d" % (x, y, x, y + 1, rng.randint(1, 20)))
+    path.write_text("\n".join(lines) + "\nEND OF INPUT\n")
+    return ["G%d_%d" % (x, y) for x in range(size) for y in range(size)]
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_find_path.py")
+
+
+def write_random_map(path, seed):
+    # a small random map, some of its edges listed twice, with the names of
+    # its cities
+    rng = random.Random(seed)
+    names = ["C%d" % i for i in range(rng.randint(2, 25))]
+    lines = []
+    for _ in range(rng.randint(1, 3*len(names))):
+        a, b = rng.sample(names, 2)
+        lines.append("%s %s %d" % (a, b, rng.randint(1, 20)))
+    if seed % 3 == 0:
+        lines.append(lines[0].rsplit(" ", 1)[0] + " %d" % rng.randint(1, 20))
+    path.write_text("\n".join(lines) + "\nEND OF INPUT\n")
+    return names
+
+
+def distance(router, algorithm, origin, destination):
+    text, _ = router.answer(algorithm, origin, destination)
+    return text.split("\n")[0]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_ch_distances_equal_ucs(tmp_path, seed):
+    map_path = tmp_path / "grid.txt"
+    names = write_grid(map_path, 8, seed)
+    find_path.contract(find_path.Graph.open(str(map_path))).save(str(map_path) + ".ch")
+    router = find_path.Router.open(str(map_path))
+    rng = random.Random(seed)
+    for _ in range(40):
+        origin, destination = rng.choice(names), rng.choice(names)
+        expected = distance(router, "ucs", origin, destination)
+        assert expected.startswith("distance: ")
+        assert distance(router, "ch", origin, destination) == expected
+
+
+def test_ch_rejects_hierarchy_of_another_map(tmp_path):
+    map_path = tmp_path / "grid.txt"
+    write_grid(map_path, 4, 0)
+    find_path.contract(find_path.Graph.open(str(map_path))).save(str(map_path) + ".ch")
+    write_grid(map_path, 4, 1)
+    router = find_path.Router.open(str(map_path))
+    text = distance(router, "ch", "G0_0", "G3_3")
+    assert "another version of the map" in text
+
+
+def test_reload_does_not_mix_maps(tmp_path):
+    map_path = tmp_path / "line.txt"
+    map_path.write_text("A B 9\nB C 1\nEND OF INPUT\n")
+    router = find_path.Router.open(str(map_path), cache=find_path.RouteCache())
+    # a query that took its snapshot before the map changed
+    old = router.snapshot
+    map_path.write_text("A C 2\nC B 5\nEND OF INPUT\n")
+    router.check_map()
+    path, _ = router.find("ucs", "A", "C", snapshot=old)
+    assert path == ["A", "B", "C"]
+    # its route is not cached for the queries on the new map
+    text, search = router.answer("ucs", "A", "C")
+    assert search is not None
+    assert text == "distance: 2 mi\npath:\nA to C: 2 mi"
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_bfs_and_dfs_print_what_the_baseline_printed(tmp_path, seed):
+    map_path = tmp_path / "map.txt"
+    names = write_random_map(map_path, seed)
+    rng = random.Random(seed)
+    for _ in range(4):
+        origin, destination = rng.choice(names), rng.choice(names)
+        for algorithm in ("bfs", "dfs"):
+            argv = ["find_path.py", algorithm, str(map_path), origin, destination]
+            expected = subprocess.run([sys.executable, BASELINE] + argv[1:],
+                                      capture_output=True, text=True).stdout
+            output = io.StringIO()
+            with redirect_stdout(output):
+                find_path.main(argv)
+            assert output.getvalue() == expected
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_batch_answers_equal_ucs_of_each_pair(tmp_path, seed):
+    map_path = tmp_path / "map.txt"
+    names = write_random_map(map_path, seed)
+    router = find_path.Router.open(str(map_path))
+    rng = random.Random(seed)
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(30)]
+    pairs.append(("Nowhere", names[0]))
+    pairs.append((names[0], "Nowhere"))
+    expected = [router.answer("ucs", origin, destination)[0] for origin, destination in pairs]
+    for workers in (1, 2):
+        assert find_path.batch(router, pairs, workers) == expected
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_bidirectional_and_landmark_searches_find_shortest_paths(tmp_path, seed):
+    map_path = tmp_path / "map.txt"
+    names = write_random_map(map_path, seed)
+    find_path.pick_landmarks(find_path.Graph.open(str(map_path)), 4).save(str(map_path) + ".alt")
+    router = find_path.Router.open(str(map_path))
+    assert router.snapshot.get_landmarks()
+    rng = random.Random(seed)
+    for _ in range(20):
+        origin, destination = rng.choice(names), rng.choice(names)
+        expected = distance(router, "ucs", origin, destination)
+        for algorithm in ("biucs", "astar", "biastar"):
+            assert distance(router, algorithm, origin, destination) == expected
+
+
+def test_latencies_keep_a_bounded_histogram():
+    latencies = find_path.Latencies()
+    values = [0.0005] + [i/100 for i in range(1, 100001)]
+    random.Random(0).shuffle(values)
+    for value in values:
+        latencies.add(value)
+    ordered = sorted(values)
+    assert latencies.count == len(values)
+    assert latencies.quantile(0.5) == pytest.approx(ordered[len(ordered)//2], rel=0.01)
+    assert latencies.quantile(0.99) == pytest.approx(ordered[len(ordered)*99//100], rel=0.01)
+    # 1% buckets from 10 microseconds to 1 second
+    assert len(latencies.buckets) < 1200
+    assert latencies.summary().startswith("100001 queries, mean ")
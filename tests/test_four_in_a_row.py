@@ -0,0 +1,203 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import four_in_a_row
+from four_in_a_row import Bitboard
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline_four_in_a_row as baseline
+
+
+class ListBoard:
+    # a board kept as lists of slots, row 0 at the top, with the methods of
+    # the game_gui board the baseline functions use
+    PLAYER1 = 1
+    PLAYER2 = 2
+    EMPTY = 0
+
+    def __init__(self, rows=6, cols=7):
+        self.rows = rows
+        self.cols = cols
+        self.slots = [[0]*cols for _ in range(rows)]
+
+    def clone(self):
+        board = ListBoard(self.rows, self.cols)
+        board.slots = [row[:] for row in self.slots]
+        return board
+
+    def placeable(self, c):
+        return self.slots[0][c] == 0
+
+    def place(self, player, c):
+        for r in range(self.rows - 1, -1, -1):
+            if self.slots[r][c] == 0:
+                self.slots[r][c] = player
+                return r
+
+    def row(self, r):
+        return list(self.slots[r])
+
+    def col(self, c):
+        return [self.slots[r][c] for r in range(self.rows)]
+
+    def terminal(self):
+        return Bitboard.from_board(self).terminal()
+
+
+def random_position(rng, plies):
+    # a position reached by random moves, which the game has not ended in,
+    # as (player to move, board)
+    while True:
+        board = Bitboard(6, 7)
+        players = (board.PLAYER1, board.PLAYER2)
+        for i in range(plies):
+            board.place(players[i % 2], rng.choice(board.moves()))
+            if board.terminal():
+                break
+        else:
+            return players[plies % 2], board
+
+
+def random_list_board(rng):
+    # a random position on a board of a random size, as (player to move,
+    # board); the game may have ended in it
+    rows, cols = rng.choice([(6, 7), (6, 7), (5, 6), (4, 5), (7, 8)])
+    board = ListBoard(rows, cols)
+    player = board.PLAYER1
+    for _ in range(rng.randrange(rows*cols)):
+        moves = [c for c in range(cols) if board.placeable(c)]
+        if not moves or board.terminal():
+            break
+        board.place(player, rng.choice(moves))
+        player = 3 - player
+    return player, board
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_evaluate_matches_baseline(seed):
+    rng = random.Random(seed)
+    for _ in range(25):
+        _, board = random_list_board(rng)
+        for player in (board.PLAYER1, board.PLAYER2):
+            expected = baseline.evaluate(player, board)
+            assert four_in_a_row.evaluate(player, board) == expected
+            assert Bitboard.from_board(board).evaluate(player - 1) == expected
+
+
+def test_get_child_boards_matches_baseline():
+    rng = random.Random(0)
+    for _ in range(20):
+        player, board = random_list_board(rng)
+        expected = baseline.get_child_boards(player, board)
+        found = four_in_a_row.get_child_boards(player, board)
+        assert [c for c, _ in found] == [c for c, _ in expected]
+        for (_, new), (_, old) in zip(found, expected):
+            assert [new.row(r) for r in range(old.rows)] == \
+                [old.row(r) for r in range(old.rows)]
+
+
+def expectimax_reference(player, board, depth_limit):
+    # expectimax on the baseline functions, with the uniform expectation of
+    # user-009 in place of the baseline's running average; ties go to the
+    # leftmost column
+    adversary = board.PLAYER2 if player == board.PLAYER1 else board.PLAYER1
+
+    def value(board, to_move, depth):
+        if depth == 0 or board.terminal():
+            return baseline.evaluate(player, board)
+        children = baseline.get_child_boards(to_move, board)
+        values = [value(child, adversary if to_move == player else player, depth - 1)
+                  for _, child in children]
+        if to_move == player:
+            return max(values)
+        return sum(values)/len(values)
+
+    best = placement = None
+    for c, child in baseline.get_child_boards(player, board):
+        v = value(child, adversary, depth_limit - 1)
+        if best is None or v > best:
+            best, placement = v, c
+    return placement
+
+
+@pytest.mark.parametrize("search", ["minimax", "alphabeta", "expectimax"])
+def test_placements_match_baseline(search):
+    # expectimax fixed the baseline's averaging, so it is checked against
+    # the baseline functions with the fix instead
+    reference = expectimax_reference if search == "expectimax" else getattr(baseline, search)
+    rng = random.Random(search)
+    for _ in range(12):
+        player, board = random_list_board(rng)
+        if board.terminal():
+            continue
+        for depth in (1, 2, 3):
+            expected = reference(player, board.clone(), depth)
+            assert getattr(four_in_a_row, search)(player, board.clone(), depth) == expected
+
+
+@pytest.mark.parametrize("pruning", ["star1", "star2"])
+def test_expectimax_pruning_keeps_placements(pruning):
+    rng = random.Random(pruning)
+    for _ in range(10):
+        player, board = random_position(rng, rng.randrange(20))
+        for depth in (2, 3, 4):
+            assert four_in_a_row.expectimax(player, board, depth, pruning=pruning) == \
+                four_in_a_row.expectimax(player, board, depth)
+
+
+def test_evaluate_many_matches_evaluate():
+    pytest.importorskip("numpy")
+    rng = random.Random(1)
+    boards = [random_position(rng, rng.randrange(30))[1] for _ in range(30)]
+    grids = [[board.row(r) for r in range(board.rows)] for board in boards]
+    for player, adversary in ((1, 2), (2, 1)):
+        scores = four_in_a_row.evaluate_many(player, adversary, grids)
+        assert list(scores) == [four_in_a_row.evaluate(player, board) for board in boards]
+
+
+@pytest.fixture
+def pools():
+    yield
+    four_in_a_row.shutdown_pools()
+
+
+@pytest.mark.parametrize("search", ["minimax", "alphabeta", "expectimax"])
+def test_parallel_and_batch_match_serial(pools, search):
+    rng = random.Random(search)
+    search = getattr(four_in_a_row, search)
+    positions = [random_position(rng, rng.randrange(20)) + (3,) for _ in range(6)]
+    # the same position twice is searched once
+    positions.append(positions[0])
+    expected = [search(player, board, depth) for player, board, depth in positions]
+    assert [four_in_a_row.parallel_search(player, board, depth, search, workers=2)
+            for player, board, depth in positions] == expected
+    assert four_in_a_row.batch_search(positions, search, workers=2) == expected
+    assert four_in_a_row.batch_search(positions, search, workers=1) == expected
+
+
+@pytest.fixture
+def endgame_solver():
+    four_in_a_row.set_endgame_solver(12)
+    yield
+    four_in_a_row.set_endgame_solver(0)
+    four_in_a_row.shutdown_pools()
+
+
+def test_workers_use_endgame_solver_set_after_they_started(endgame_solver):
+    rng = random.Random(3)
+    positions = [random_position(rng, 30) + (2,) for _ in range(12)]
+    four_in_a_row.set_endgame_solver(0)
+    # start the pool with the solver off, then turn it on
+    four_in_a_row.batch_search(positions[:2], workers=2)
+    four_in_a_row.set_endgame_solver(12)
+    expected = [four_in_a_row.alphabeta(player, board, depth)
+                for player, board, depth in positions]
+    assert four_in_a_row.batch_search(positions, workers=2) == expected
+    assert [four_in_a_row.parallel_search(player, board, depth, workers=2)
+            for player, board, depth in positions] == expected